@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from motor_analitico import ordenar, tipos_resultado
+
+# --- VÁRIOS AGREGADOS NUMA PASSADA ---
+# A página declara todos os agregados de que precisa (chaves, medidas, condições) e recebe o
+# pacote inteiro de uma vez. Cada coluna é fatorada uma única vez (categóricas já trazem os
+# códigos), cada condição vira uma máscara uma única vez e os grupos saem de np.bincount sobre
+# os códigos combinados. O resultado de cada item é igual ao de agregar()/contar().
+#
+# Item: {'chaves': [...], 'medidas': {nome: (coluna, funcao)}, 'top': n,
+#        'onde': [nomes de condições], 'se': {coluna: predicado(valor em texto)}}
+
+# Acima deste número de combinações de chaves os grupos saem de np.unique em vez de bincount
+LIMITE_BINCOUNT = 1 << 22
+
+def fatorar(df, fatores, coluna):
+    """(códigos, valores) da coluna; -1 = nulo. Calculado uma vez por passada."""
+    if coluna not in fatores:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            fatores[coluna] = (serie.cat.codes.to_numpy(), serie.cat.categories.astype(str))
+        else:
+            fatores[coluna] = pd.factorize(serie)
+    return fatores[coluna]
+
+def mascara_valores(df, fatores, coluna, predicado):
+    """Aplica o predicado a cada valor distinto (não a cada linha) e expande pelos códigos."""
+    codigos, valores = fatorar(df, fatores, coluna)
+    permitido = np.array([bool(predicado(str(v))) for v in valores] + [False], dtype=bool)
+    return permitido[codigos]  # código -1 (nulo) cai no False do final
+
+def derivar(df, fatores, nome, coluna, funcao):
+    """Chave derivada por valor distinto (ex.: agrupar tipos de veículo); nulos recebem funcao('nan')."""
+    codigos, valores = fatorar(df, fatores, coluna)
+    rotulos = [funcao(str(v)) for v in valores] + [funcao('nan')]
+    novos, unicos = pd.factorize(np.array(rotulos, dtype=object))
+    fatores[nome] = (novos[codigos], pd.Index(unicos))
+
+def valores_float(df, coluna):
+    return df[coluna].to_numpy(dtype='float64', na_value=np.nan)
+
+def totais(df, fatores, medidas, mascara):
+    linha = {}
+    for nome, (coluna, funcao) in medidas.items():
+        if funcao == 'size': linha[nome] = int(mascara.sum())
+        elif funcao == 'nunique':
+            codigos = fatorar(df, fatores, coluna)[0][mascara]
+            linha[nome] = len(np.unique(codigos[codigos >= 0]))
+        else:
+            valores = valores_float(df, coluna)[mascara]
+            linha[nome] = np.nansum(valores) if funcao == 'sum' else np.nanmean(valores) if len(valores) else np.nan
+    return pd.DataFrame([linha])
+
+def agrupar(df, fatores, chaves, medidas, mascara):
+    codigo, tamanhos = np.zeros(len(df), dtype=np.int64), []
+    for chave in chaves:
+        codigos, valores = fatorar(df, fatores, chave)
+        mascara = mascara & (codigos >= 0)
+        codigo = codigo * len(valores) + codigos
+        tamanhos.append(len(valores))
+    codigo = codigo[mascara]
+    combinacoes = int(np.prod(tamanhos))
+    if combinacoes <= LIMITE_BINCOUNT:
+        presentes = np.flatnonzero(np.bincount(codigo, minlength=combinacoes))
+        posicao = np.zeros(combinacoes, dtype=np.int64)
+        posicao[presentes] = np.arange(len(presentes))
+        grupo = posicao[codigo]
+    else:
+        presentes, grupo = np.unique(codigo, return_inverse=True)
+    n = len(presentes)
+
+    partes = {}
+    for nome, (coluna, funcao) in medidas.items():
+        if funcao == 'size':
+            partes[nome] = np.bincount(grupo, minlength=n)
+        elif funcao == 'nunique':
+            codigos, valores = fatorar(df, fatores, coluna)
+            codigos = codigos[mascara]
+            validos = codigos >= 0
+            pares = np.unique(grupo[validos] * len(valores) + codigos[validos])
+            partes[nome] = np.bincount(pares // len(valores), minlength=n)
+        else:
+            valores = valores_float(df, coluna)[mascara]
+            nulos = np.isnan(valores)
+            soma = np.bincount(grupo, weights=np.where(nulos, 0, valores), minlength=n)
+            partes[nome] = soma if funcao == 'sum' else soma / np.bincount(grupo, weights=~nulos, minlength=n)
+
+    colunas, resto = {}, presentes
+    for chave, tamanho in reversed(list(zip(chaves, tamanhos))):
+        resto, codigos = np.divmod(resto, tamanho)
+        colunas[chave] = fatorar(df, fatores, chave)[1].take(codigos)
+    return pd.DataFrame({**{c: colunas[c] for c in chaves}, **partes})
+
+def calcular_agregados(df, itens, condicoes=None, derivadas=None):
+    """
+    Todos os itens sobre o mesmo frame: {nome: DataFrame}. condicoes = {nome: f(df, fatores) -> máscara};
+    derivadas = {chave: (coluna, funcao por valor)}.
+    """
+    fatores, mascaras, resultado = {}, {}, {}
+    for nome, (coluna, funcao) in (derivadas or {}).items():
+        derivar(df, fatores, nome, coluna, funcao)
+    for nome, item in itens.items():
+        mascara = np.ones(len(df), dtype=bool)
+        for condicao in item.get('onde', []):
+            if condicao not in mascaras: mascaras[condicao] = np.asarray(condicoes[condicao](df, fatores), dtype=bool)
+            mascara &= mascaras[condicao]
+        for coluna, predicado in item.get('se', {}).items():
+            mascara &= mascara_valores(df, fatores, coluna, predicado)
+        chaves, medidas = list(item.get('chaves', [])), item['medidas']
+        if not chaves:
+            resultado[nome] = totais(df, fatores, medidas, mascara).astype(tipos_resultado(df, medidas))
+            continue
+        res = agrupar(df, fatores, chaves, medidas, mascara).astype(tipos_resultado(df, medidas))
+        resultado[nome] = ordenar(res, chaves, next(iter(medidas)), item.get('top'))
+    return resultado
@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+import time
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from streamlit import runtime
+from banco import settings
+from versoes import versoes_tabelas, janela_atual
+from dados import carregar_dataset, versao_dataset
+from utils import (carregar_opcoes_prf, carregar_brs_prf, carregar_dados_prf, carregar_grade_mapa,
+                   carregar_denominadores, carregar_capacitacoes)
+from geometrias import carregar_geometria
+from coalescencia import aguardar_atualizacoes
+from views import produtos, prf, obitos, comparativo
+
+# --- AQUECIMENTO DOS CACHES EM SEGUNDO PLANO ---
+# Uma thread por processo carrega os datasets pesados (e os recortes padrão das páginas) assim que o
+# servidor sobe e de novo a cada nova versão publicada pelo ETL, antes de qualquer usuário pedir.
+# Os loaders são os mesmos das páginas, então os caches preenchidos aqui são os que as sessões usam.
+
+# Chamadas de cache fora de uma sessão registram um aviso por chamada; nesta thread isso é esperado
+logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').setLevel(logging.ERROR)
+
+# Datasets declarados pelas páginas (ver PAGINAS em main.py)
+DECLARACOES = [produtos.DADOS_VISAO_GERAL, produtos.DADOS_ANALISE_TEMPORAL, prf.DADOS_PRF,
+               obitos.DADOS_OBITOS, comparativo.DADOS_COMPARATIVO]
+
+def aquecer_prf():
+    """Base compartilhada, opções da barra lateral e o recorte padrão da página (ano mais recente)."""
+    opcoes = carregar_opcoes_prf()
+    if not opcoes['ANO']: return
+    ano = [max(opcoes['ANO'])]
+    carregar_brs_prf(ano, [])
+    carregar_dados_prf(anos=ano)
+    carregar_grade_mapa()
+
+def aquecer_comparativo():
+    """Cubo (UF, município, ano) do Comparativo, montado a partir dos datasets já aquecidos."""
+    (v_prod, df_prod), (v_prf, df_prf) = (versao_dataset(nome, colunas) for nome, colunas in comparativo.DADOS_COMPARATIVO.items())
+    if df_prod.empty or df_prf.empty: return
+    comparativo.cubo_comparativo(v_prod, v_prf, df_prod, df_prf)
+
+# Tarefas executadas a cada aquecimento: (nome, função sem argumentos, crítica). O processo só fica
+# pronto quando todas as críticas funcionaram (os datasets das páginas incluem os óbitos).
+TAREFAS_AQUECIMENTO = [
+    ('datasets das páginas', lambda: [carregar_dataset(n, c) for d in DECLARACOES for n, c in d.items()], True),
+    ('PRF (recorte padrão)', aquecer_prf, True),
+    ('cubo do Comparativo', aquecer_comparativo, False),
+    ('população IBGE', carregar_denominadores, False),
+    ('capacitações', carregar_capacitacoes, False),
+    ('geometrias das UFs', carregar_geometria, False),
+]
+
+_estado = {'pronto': False, 'versoes': None, 'janela': None, 'aquecido_em': None, 'duracao': None,
+           'falhas': [], 'pendentes': []}
+_lock = threading.Lock()
+_iniciado = threading.Event()
+
+def estado_aquecimento():
+    with _lock: return dict(_estado)
+
+def aquecer(somente=None):
+    """Executa as tarefas (todas ou só as de 'somente'); falhas individuais não impedem as demais."""
+    inicio, falhas, pendentes = time.perf_counter(), [], []
+    versoes, janela = versoes_tabelas(), janela_atual()
+    for nome, tarefa, critica in TAREFAS_AQUECIMENTO:
+        if somente is not None and nome not in somente: continue
+        try: tarefa()
+        except Exception as e:  # a thread não pode morrer por uma tarefa (banco fora, rede, etc.)
+            falhas.append(f"{nome}: {str(e).splitlines()[0]}")
+            pendentes.append(nome)
+    # Com versão nova, os loaders serviram a anterior e dispararam a atualização: só fica pronto quando ela termina
+    aguardar_atualizacoes()
+    criticas = {nome for nome, _, critica in TAREFAS_AQUECIMENTO if critica}
+    with _lock:
+        # Uma vez pronto, segue pronto: os caches já aquecidos continuam servindo a versão anterior
+        pronto = _estado['pronto'] or not criticas.intersection(pendentes)
+        _estado.update(pronto=pronto, versoes=versoes, janela=janela, aquecido_em=str(pd.Timestamp.now().floor('s')),
+                       duracao=round(time.perf_counter() - inicio, 1), falhas=falhas, pendentes=pendentes)
+    situacao = "caches prontos" if pronto else "tarefas críticas falharam; prontidão segue em 503"
+    print(f"[aquecimento] {situacao} em {_estado['duracao']}s" + (f" ({len(falhas)} falhas)" if falhas else ""))
+
+def ciclo_aquecimento():
+    # Em modo lançador (servidor.py) a thread nasce antes do runtime do Streamlit
+    while not runtime.exists(): time.sleep(0.2)
+    while True:
+        estado = estado_aquecimento()
+        # Tabelas pesadas sem carimbo expiram por janela de CACHE_TTL_SEM_CARIMBO: a virada da janela também reaquece
+        if (versoes_tabelas(), janela_atual()) != (estado['versoes'], estado['janela']):
+            aquecer()
+        elif estado['pendentes']:
+            # Tarefas que falharam são refeitas no ciclo seguinte, sem esperar versão nova
+            aquecer(somente=estado['pendentes'])
+        time.sleep(settings.VERSAO_INTERVALO)
+
+# --- PRONTIDÃO (PARA O BALANCEADOR DE CARGA) ---
+class ProntidaoHandler(BaseHTTPRequestHandler):
+    """GET em qualquer caminho: 200 com os caches aquecidos, 503 enquanto aquecem."""
+    def do_GET(self):
+        estado = estado_aquecimento()
+        # Sem as mensagens de erro (podem trazer detalhes do banco); elas ficam no painel DEBUG
+        corpo = json.dumps({'pronto': estado['pronto'], 'aquecido_em': estado['aquecido_em'],
+                            'pendentes': estado['pendentes']}).encode('utf-8')
+        self.send_response(200 if estado['pronto'] else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args): pass
+
+def iniciar_aquecimento(prontidao=None):
+    """
+    Idempotente: a primeira chamada do processo sobe a thread de aquecimento e, com 'prontidao'
+    (servidor.py) ou PRONTIDAO=True, o endpoint de prontidão.
+    """
+    with _lock:
+        if _iniciado.is_set(): return
+        _iniciado.set()
+    threading.Thread(target=ciclo_aquecimento, name='aquecimento', daemon=True).start()
+    if (settings.PRONTIDAO if prontidao is None else prontidao) and settings.PORTA_PRONTIDAO:
+        try:
+            servidor = ThreadingHTTPServer((settings.HOST_PRONTIDAO, settings.PORTA_PRONTIDAO), ProntidaoHandler)
+            threading.Thread(target=servidor.serve_forever, name='prontidao', daemon=True).start()
+        except OSError as e:
+            print(f"[aquecimento] endpoint de prontidão indisponível na porta {settings.PORTA_PRONTIDAO}: {e}")
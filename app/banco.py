@@ -0,0 +1,92 @@
+import streamlit as st
+import pandas as pd
+import os
+import sys
+import time
+import threading
+from collections import deque, OrderedDict
+from sqlalchemy import create_engine
+
+# Raiz do projeto no path para acessar config/settings.py
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path: sys.path.append(BASE_DIR)
+from config import settings
+
+class ErroBanco(RuntimeError):
+    """Falha de consulta com o nome do dataset (exibida na tela em vez de um DataFrame vazio)."""
+    def __init__(self, nome, erro):
+        super().__init__(f"{nome}: {erro}")
+        self.nome = nome
+        self.erro = erro
+
+# --- ENGINE ÚNICO DO PROCESSO ---
+@st.cache_resource(show_spinner=False)
+def obter_engine():
+    """Um engine (e pool) por processo: evita novo handshake TCP/autenticação a cada cache miss."""
+    return create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+# --- INSTRUMENTAÇÃO ---
+_historico = deque(maxlen=settings.DB_HISTORICO_CONSULTAS)
+_lock_historico = threading.Lock()
+
+def registrar_consulta(nome, segundos, linhas, bytes_, erro=None):
+    with _lock_historico:
+        _historico.append({
+            'momento': pd.Timestamp.now(), 'consulta': nome, 'segundos': round(segundos, 4),
+            'linhas': linhas, 'bytes': bytes_, 'erro': erro,
+        })
+    if settings.DEBUG or erro:
+        status = f"ERRO {erro}" if erro else f"{linhas:,} linhas / {bytes_ / 1e6:.1f} MB"
+        print(f"[banco] {nome}: {segundos * 1000:.0f} ms - {status}")
+
+def metricas_consultas():
+    """Histórico recente (latência, linhas e bytes por consulta) para o painel de desempenho."""
+    with _lock_historico:
+        return pd.DataFrame(list(_historico))
+
+# --- MEMÓRIA DOS DATASETS EM CACHE ---
+# Registrada no cache miss (o resultado de consultar é o que vai para o cache dos loaders)
+MAX_RELATORIO_MEMORIA = 64
+_memoria = OrderedDict()
+
+def registrar_memoria(nome, df):
+    uso = df.memory_usage(deep=True, index=False)
+    tipos = df.dtypes.astype(str).value_counts()
+    with _lock_historico:
+        _memoria.pop(nome, None)
+        _memoria[nome] = {
+            'dataset': nome, 'linhas': len(df), 'colunas': df.shape[1], 'MB': round(uso.sum() / 1e6, 2),
+            'maiores_colunas': ', '.join(f"{c} {v / 1e6:.1f}MB" for c, v in uso.nlargest(3).items()),
+            'tipos': ', '.join(f"{t}:{n}" for t, n in tipos.items()),
+            'momento': pd.Timestamp.now(),
+        }
+        while len(_memoria) > MAX_RELATORIO_MEMORIA: _memoria.popitem(last=False)
+    return int(uso.sum())
+
+def relatorio_memoria():
+    """Memória por dataset carregado (maiores primeiro) para o painel de desempenho."""
+    with _lock_historico:
+        df = pd.DataFrame(list(_memoria.values()))
+    return df.sort_values('MB', ascending=False) if not df.empty else df
+
+def consultar(sql, nome, params=None, **kwargs):
+    """
+    Executa a consulta no engine compartilhado e registra latência, linhas e bytes.
+    Falhas são registradas e propagadas como ErroBanco. kwargs vão para o pd.read_sql (dtype, parse_dates).
+    """
+    inicio = time.perf_counter()
+    try:
+        with obter_engine().connect() as conn:
+            df = pd.read_sql(sql, conn, params=params, **kwargs)
+    except Exception as e:
+        registrar_consulta(nome, time.perf_counter() - inicio, 0, 0, erro=str(e).splitlines()[0])
+        raise ErroBanco(nome, e) from e
+    registrar_consulta(nome, time.perf_counter() - inicio, len(df), registrar_memoria(nome, df))
+    return df
@@ -0,0 +1,153 @@
+import streamlit as st
+import functools
+import inspect
+import sys
+import threading
+import time
+import pandas as pd
+from collections import defaultdict
+from contextlib import nullcontext
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from banco import settings
+
+# --- CACHE DOS LOADERS COM ORÇAMENTO DE BYTES ---
+# Substitui o st.cache_data nos loaders de datasets. Cada entrada guarda o tamanho real
+# (memory_usage deep) e o custo de recarga (segundos da última carga). Acima de CACHE_MAX_MB sai a
+# entrada de menor prioridade GreedyDual-Size: prioridade = relógio + custo / MB, renovada a cada
+# acerto; o relógio sobe até a prioridade da última removida, então entradas paradas envelhecem
+# (como num LRU) e, entre as paradas, as grandes e baratas de recarregar saem primeiro.
+# A mesma chave é carregada uma vez só. Quem chama recebe uma cópia rasa (copy(deep=False)): os
+# arrays são os do cache, sem duplicar o DataFrame a cada rerun. Criar ou substituir colunas na
+# cópia é seguro; alterar valores no lugar (loc/iloc/at =, inplace=True) mudaria o cache de todos.
+
+_entradas = {}  # (funcao, argumentos) -> entrada
+_travas = {}    # chave -> Lock da carga em andamento
+_lock = threading.Lock()
+_estado = {'bytes': 0, 'relogio': 0.0}
+_uso = defaultdict(lambda: {'acertos': 0, 'cargas': 0, 'remocoes': 0})
+_local = threading.local()
+
+class ForaDoCache(LookupError):
+    """Levantada em somente_cache() quando a chave precisaria ser carregada."""
+
+def tamanho(valor):
+    """Bytes ocupados: DataFrames/Series por memory_usage(deep=True), coleções somando os itens."""
+    if isinstance(valor, pd.DataFrame): return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series): return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict): return sys.getsizeof(valor) + sum(tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)): return sys.getsizeof(valor) + sum(tamanho(v) for v in valor)
+    return sys.getsizeof(valor)
+
+def copia_rasa(valor):
+    """DataFrames/Series com os mesmos arrays; dicts, listas e tuplas copiados item a item."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)): return valor.copy(deep=False)
+    if isinstance(valor, dict): return {k: copia_rasa(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)): return type(valor)(copia_rasa(v) for v in valor)
+    return valor
+
+def prioridade(entrada):
+    return _estado['relogio'] + max(entrada['custo'], 1e-3) / max(entrada['bytes'] / 1e6, 1e-3)
+
+def remover(chave):
+    entrada = _entradas.pop(chave)
+    _estado['bytes'] -= entrada['bytes']
+    _uso[entrada['dataset']]['remocoes'] += 1
+    return entrada
+
+def liberar(limite, nova):
+    """Remove as entradas de menor prioridade (nunca a recém-carregada) até caber no limite."""
+    while _estado['bytes'] > limite and len(_entradas) > 1:
+        vitima = min((k for k in _entradas if k != nova), key=lambda k: _entradas[k]['prioridade'])
+        _estado['relogio'] = _entradas[vitima]['prioridade']
+        remover(vitima)
+
+def guardar(chave, dataset, valor, custo, max_entries):
+    entrada = {'dataset': dataset, 'valor': valor, 'bytes': tamanho(valor), 'custo': custo,
+               'acessado_em': time.monotonic()}
+    limite = settings.CACHE_MAX_MB * 1e6
+    if entrada['bytes'] > limite:
+        print(f"[cache] {dataset}: {entrada['bytes'] / 1e6:.0f} MB acima de CACHE_MAX_MB - não guardado")
+        return False
+    entrada['prioridade'] = prioridade(entrada)
+    if chave in _entradas: remover(chave)
+    _entradas[chave] = entrada
+    _estado['bytes'] += entrada['bytes']
+    if max_entries:
+        # Teto de entradas por loader (ex.: versões antigas): sai a menos usada recentemente
+        mesmas = [k for k in _entradas if k[0] == chave[0]]
+        for antiga in sorted(mesmas, key=lambda k: _entradas[k]['acessado_em'])[:max(len(mesmas) - max_entries, 0)]:
+            remover(antiga)
+    liberar(limite, chave)
+    return True
+
+def buscar(chave, contar=True):
+    entrada = _entradas.get(chave)
+    if entrada is None: return None
+    entrada['prioridade'] = prioridade(entrada)
+    entrada['acessado_em'] = time.monotonic()
+    if contar: _uso[entrada['dataset']]['acertos'] += 1
+    return entrada
+
+def obter(chave, dataset, carregar, max_entries, show_spinner):
+    with _lock:
+        entrada = buscar(chave)
+        if entrada is None:
+            if getattr(_local, 'somente_cache', False): raise ForaDoCache(dataset)
+            trava = _travas.setdefault(chave, threading.Lock())
+    if entrada is not None: return copia_rasa(entrada['valor'])
+    with trava:
+        # Outro chamador pode ter carregado enquanto esperávamos: a carga coalescida não conta como acerto
+        with _lock: entrada = buscar(chave, contar=False)
+        if entrada is not None: return copia_rasa(entrada['valor'])
+        spinner = st.spinner(show_spinner) if show_spinner and get_script_run_ctx() else nullcontext()
+        try:
+            inicio = time.perf_counter()
+            with spinner: valor = carregar()
+            custo = time.perf_counter() - inicio
+            with _lock:
+                _uso[dataset]['cargas'] += 1
+                guardado = guardar(chave, dataset, valor, custo, max_entries)
+        finally:
+            with _lock: _travas.pop(chave, None)
+    return copia_rasa(valor) if guardado else valor
+
+def cache_orcado(dataset, max_entries=None, show_spinner=False):
+    """
+    Decorador no lugar do st.cache_data. 'dataset' (nome ou função dos argumentos) agrupa o uso no
+    relatório; argumentos com '_' no início não entram na chave, como no Streamlit.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = (funcao.__qualname__, tuple((n, v) for n, v in argumentos.arguments.items() if not n.startswith('_')))
+            nome = dataset(argumentos.arguments) if callable(dataset) else dataset
+            return obter(chave, nome, lambda: funcao(*args, **kwargs), max_entries, show_spinner)
+        return envoltorio
+    return decorador
+
+class somente_cache:
+    """Dentro do bloco, loaders com cache_orcado levantam ForaDoCache em vez de carregar."""
+    def __enter__(self): _local.somente_cache = True
+    def __exit__(self, *args): _local.somente_cache = False
+
+def uso_cache():
+    """Uso atual por dataset (entradas, MB, custo de recarga, acertos/cargas/remoções) para o painel."""
+    with _lock:
+        linhas = {nome: {'dataset': nome, 'entradas': 0, 'MB': 0.0, 'custo_s': 0.0, **contadores}
+                  for nome, contadores in _uso.items()}
+        for entrada in _entradas.values():
+            linha = linhas[entrada['dataset']]
+            linha['entradas'] += 1
+            linha['MB'] += entrada['bytes'] / 1e6
+            linha['custo_s'] += entrada['custo']
+    df = pd.DataFrame(list(linhas.values()))
+    if df.empty: return df
+    return df.round({'MB': 2, 'custo_s': 2}).sort_values('MB', ascending=False)
+
+def total_cache():
+    with _lock:
+        return {'MB': round(_estado['bytes'] / 1e6, 1), 'limite_MB': settings.CACHE_MAX_MB, 'entradas': len(_entradas)}
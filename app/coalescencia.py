@@ -0,0 +1,90 @@
+import threading
+import time
+from banco import settings
+from cache_orcado import somente_cache, ForaDoCache
+
+# --- CARGAS COALESCIDAS COM VERSÃO ANTERIOR DURANTE A ATUALIZAÇÃO ---
+# Uma carga por (dataset, versão) no processo: sessões que chegam durante a carga esperam por
+# ela e depois leem o mesmo cache, em vez de repetir a consulta. Quando o ETL publica uma versão
+# nova e já existe uma anterior carregada, quem chega recebe a anterior na hora enquanto uma
+# única thread carrega a nova; a troca acontece no primeiro rerun depois que ela termina.
+# Loaders com cache_orcado não têm o valor guardado aqui: a versão anterior é relida do próprio
+# cache (que já conta os bytes); se ela já saiu do cache, a nova é carregada na hora.
+
+_lock = threading.Lock()
+_prontos = {}       # dataset -> (versao, valor ou None, carregar) da última carga concluída
+_em_voo = {}        # (dataset, versao) -> Event da carga em andamento
+_atualizacoes = {}  # dataset -> thread de atualização em segundo plano
+_falhas = {}        # dataset -> momento da última atualização que falhou
+
+def carregar_unico(chave, versao, carregar, reler=False):
+    """Só o primeiro chamador executa 'carregar'; os demais esperam e leem o cache já preenchido."""
+    with _lock:
+        evento = _em_voo.get((chave, versao))
+        lider = evento is None
+        if lider: evento = _em_voo[(chave, versao)] = threading.Event()
+    if not lider:
+        evento.wait()
+        return carregar()  # acerto de cache (se o líder falhou, tenta de novo e propaga o erro)
+    try:
+        valor = carregar()
+        with _lock: _prontos[chave] = (versao, None if reler else valor, carregar)
+        return valor
+    finally:
+        with _lock: _em_voo.pop((chave, versao), None)
+        evento.set()
+
+def atualizar(chave, versao, carregar, reler):
+    try:
+        carregar_unico(chave, versao, carregar, reler)
+        _falhas.pop(chave, None)
+    except Exception as e:  # a versão anterior continua no ar; nova tentativa após VERSAO_INTERVALO
+        _falhas[chave] = time.monotonic()
+        print(f"[coalescencia] {chave} versão {versao}: {str(e).splitlines()[0]} - mantendo a versão anterior")
+
+def atualizar_em_segundo_plano(chave, versao, carregar, reler):
+    with _lock:
+        if chave in _atualizacoes and _atualizacoes[chave].is_alive(): return
+        if time.monotonic() - _falhas.get(chave, float('-inf')) < settings.VERSAO_INTERVALO: return
+        thread = _atualizacoes[chave] = threading.Thread(target=atualizar, args=(chave, versao, carregar, reler),
+                                                         name=f"atualizacao-{chave}", daemon=True)
+    thread.start()
+
+def carregar_versionado(chave, versao, carregar, reler=False):
+    """
+    (versão servida, valor). 'carregar' (sem argumentos) lê a versão pedida, em geral por um loader
+    com cache; reler=True para loaders com cache_orcado (a versão anterior é relida do cache, em cópia).
+    """
+    with _lock: pronto = _prontos.get(chave)
+    if pronto is None:
+        return versao, carregar_unico(chave, versao, carregar, reler)
+    if pronto[0] == versao:
+        return versao, carregar()
+    if reler:
+        try:
+            with somente_cache(): anterior = pronto[2]()
+        except ForaDoCache:
+            return versao, carregar_unico(chave, versao, carregar, reler)
+    else:
+        anterior = pronto[1]
+    atualizar_em_segundo_plano(chave, versao, carregar, reler)
+    return pronto[0], anterior
+
+def carregar_coalescido(chave, versao, carregar, reler=False):
+    return carregar_versionado(chave, versao, carregar, reler)[1]
+
+def versao_servida(chave, versao):
+    """Versão que carregar_versionado serviria agora (a anterior enquanto a nova carrega)."""
+    with _lock: pronto = _prontos.get(chave)
+    return versao if pronto is None else pronto[0]
+
+def aguardar_atualizacoes(timeout=None):
+    """Espera as atualizações em segundo plano (usado pelo aquecimento antes de se declarar pronto)."""
+    with _lock: threads = list(_atualizacoes.values())
+    for thread in threads: thread.join(timeout)
+
+def estado_coalescencia():
+    with _lock:
+        return {'prontos': {str(k): v for k, (v, _, _) in _prontos.items()},
+                'atualizando': [str(k) for k, t in _atualizacoes.items() if t.is_alive()],
+                'em_voo': [f"{k}@{v}" for k, v in _em_voo]}
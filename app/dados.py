@@ -0,0 +1,87 @@
+import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from banco import consultar, ErroBanco
+from utils import versao_dados_prf, versao_dados_obitos, exibir_falha
+from config.schema import SCHEMAS, tipos_pandas, colunas_data
+from versoes import versao
+from coalescencia import carregar_versionado
+from cache_orcado import cache_orcado
+
+# --- CATÁLOGO DE DATASETS ---
+# Tabelas de gestão: nome do dataset -> (tabela no banco, valor para preencher nulos)
+TABELAS_GESTAO = {
+    'mapa': ('ranking_uf', None),
+    'org': ('orgaos_completo', "-"),
+    'prod': ('stats_produtos', 0),
+    'status': ('stats_status_uf', 0),
+    'users': ('usuarios', "-"),
+    'mun': ('stats_municipios', None),
+    'raw': ('produtos_completo', None),
+    'mensal': ('produtos_mensal', None),
+}
+
+# Datasets com carregador próprio (recebem a lista de colunas quando suportam); devolvem (versão, dados)
+CARREGADORES = {
+    'prf': lambda colunas: versao_dados_prf(colunas=colunas),
+    'obitos': lambda colunas: versao_dados_obitos(),
+}
+
+@cache_orcado(lambda argumentos: TABELAS_GESTAO[argumentos['nome']][0], max_entries=32)
+def carregar_tabela(nome, colunas=None, versao=None):
+    """
+    Lê uma tabela de gestão (apenas as colunas pedidas, quando informadas).
+    Tabelas com contrato em config/schema.py já chegam tipadas (ex.: DATA_CADASTRO como data).
+    'versao' (carimbo do ETL) só entra na chave do cache.
+    """
+    tabela, preencher = TABELAS_GESTAO[nome]
+    if tabela in SCHEMAS:
+        schema = SCHEMAS[tabela]
+        cols = list(colunas) if colunas else list(schema)
+        df = consultar(f"SELECT {', '.join(cols)} FROM {tabela}", tabela,
+                       dtype=tipos_pandas(schema, cols), parse_dates=colunas_data(schema, cols))
+    elif colunas:
+        try: df = consultar(f"SELECT {', '.join(colunas)} FROM {tabela}", tabela)
+        except ErroBanco: df = consultar(f"SELECT * FROM {tabela}", f"{tabela} (*)")
+    else:
+        df = consultar(f"SELECT * FROM {tabela}", tabela)
+    return df.fillna(preencher) if preencher is not None else df
+
+def versao_dataset(nome, colunas=None):
+    """
+    (versão, dados): a versão é a dos dados devolvidos, lida na mesma carga, e serve de chave para
+    os caches derivados deles (com uma atualização em andamento, ambos são os da versão anterior).
+    """
+    colunas = tuple(colunas) if colunas else None
+    if nome in CARREGADORES: return CARREGADORES[nome](colunas)
+    v = versao(TABELAS_GESTAO[nome][0])
+    # Uma carga por (tabela, colunas, versão); com versão nova a caminho, a anterior segue servida
+    return carregar_versionado(('tabela', nome, colunas), v, lambda: carregar_tabela(nome, colunas, v), reler=True)
+
+def carregar_dataset(nome, colunas=None):
+    return versao_dataset(nome, colunas)[1]
+
+def carregar_dados_pagina(declaracao):
+    """
+    Resolve em paralelo apenas os datasets declarados pela página ({nome: colunas ou None}).
+    Cada dataset tem cache próprio, então trocar de página não recarrega os demais.
+    Falhas são exibidas na tela e o dataset correspondente segue vazio.
+    Retorna ({nome: DataFrame}, {nome: versão dos dados}), a versão None nas falhas.
+    """
+    if not declaracao: return {}, {}
+    ctx = get_script_run_ctx()
+
+    def tarefa(item):
+        # Threads auxiliares precisam do contexto da sessão para usar o cache do Streamlit
+        add_script_run_ctx(threading.current_thread(), ctx)
+        nome, colunas = item
+        try: return nome, *versao_dataset(nome, colunas), None
+        except ErroBanco as e: return nome, None, pd.DataFrame(), e
+
+    with ThreadPoolExecutor(max_workers=len(declaracao)) as executor:
+        resultados = list(executor.map(tarefa, declaracao.items()))
+
+    for *_, erro in resultados:
+        if erro: exibir_falha(erro)
+    return {nome: df for nome, _, df, _ in resultados}, {nome: v for nome, v, _, _ in resultados}
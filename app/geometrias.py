@@ -0,0 +1,36 @@
+import streamlit as st
+import json
+import os
+from banco import settings
+from config.malhas import FONTES, baixar, simplificar_camada
+
+# --- GEOMETRIAS LOCAIS (UFs e municípios) ---
+# Arquivos pré-simplificados por scripts/gerar_geometrias.py em data/geometrias/<camada>_<nivel>.geojson.
+# Cada arquivo é lido uma vez por processo (st.cache_resource: sem cópia por sessão) e o nível é
+# escolhido pelo tamanho do mapa na tela, o que reduz o payload enviado ao navegador.
+
+# Maior lado do mapa na tela (px) -> nível de detalhe
+NIVEIS_POR_TAMANHO = [(450, 'baixa'), (900, 'media'), (float('inf'), 'alta')]
+
+def nivel_por_tamanho(tamanho_px):
+    return next(nivel for limite, nivel in NIVEIS_POR_TAMANHO if tamanho_px <= limite)
+
+@st.cache_resource(show_spinner=False)
+def ler_geometria(camada, nivel):
+    caminho = os.path.join(settings.GEOMETRIAS_DIR, f"{camada}_{nivel}.geojson")
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    # Sem o arquivo local: baixa a malha original e simplifica no nível pedido, como o script faria
+    print(f"[geometrias] {caminho} não encontrado; baixando e simplificando a malha (rode scripts/gerar_geometrias.py {camada}).")
+    return simplificar_camada(baixar(FONTES[camada][0]), camada, nivel)
+
+def carregar_geometria(camada='ufs', tamanho_px=600, chave=None, valores=None):
+    """
+    GeoJSON da camada no nível adequado ao tamanho do mapa. Com 'chave' (propriedade) e 'valores',
+    devolve só as feições exibidas. O resultado é compartilhado: não modificar.
+    """
+    geo = ler_geometria(camada, nivel_por_tamanho(tamanho_px))
+    if chave is None or valores is None: return geo
+    valores = set(valores)
+    return {'type': 'FeatureCollection', 'features': [f for f in geo['features'] if f['properties'].get(chave) in valores]}
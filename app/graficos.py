@@ -0,0 +1,180 @@
+import streamlit as st
+import plotly.graph_objects as go
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import threading
+from collections import deque
+from banco import settings
+
+# --- ORÇAMENTO DE PAYLOAD DOS GRÁFICOS ---
+# Todo gráfico passa por exibir_grafico: mede o JSON enviado ao navegador e o tempo de preparo
+# (desde o gráfico anterior do mesmo rerun) e registra no histórico. Fora do DEBUG o to_json só
+# roda quando uma estimativa barata (valores dos arrays) passa da metade do limite: o st.plotly_chart
+# já serializa a figura, e medir todas dobraria esse custo a cada rerun. Acima de GRAFICO_MAX_KB a
+# figura é reduzida antes do envio: barras viram top-N + "Outros", histogramas e mapas de
+# densidade são agregados em faixas/células e dispersões passam para WebGL.
+
+TOP_REDUCAO = 30            # categorias mantidas nas barras reduzidas
+BINS_REDUCAO = 50           # faixas dos histogramas reduzidos
+CASAS_REDUCAO_MAPA = (2, 1, 0)  # arredondamentos (graus) tentados nos mapas reduzidos, do mais fino ao mais grosso
+BYTES_POR_VALOR = 20        # JSON médio de um valor de array (floats com todas as casas)
+BYTES_BASE = 8000           # layout e template do plotly
+ATRIBUTOS_ARRAY = ('x', 'y', 'z', 'lat', 'lon', 'text', 'customdata', 'hovertext', 'locations', 'values', 'labels', 'ids')
+
+_historico = deque(maxlen=settings.DB_HISTORICO_CONSULTAS)
+_lock = threading.Lock()
+_marcador = threading.local()  # cada sessão roda o script na sua thread
+
+def iniciar_medicao():
+    """Chamado no início de cada rerun: o preparo do primeiro gráfico conta a partir daqui."""
+    _marcador.inicio = time.perf_counter()
+
+def tamanho_json(fig):
+    inicio = time.perf_counter()
+    tamanho = len(fig.to_json(validate=False))
+    return tamanho, time.perf_counter() - inicio
+
+def valores_geojson(geo):
+    """Coordenadas (2 por vértice) dos polígonos de um GeoJSON embutido no trace."""
+    if not isinstance(geo, dict): return 0
+    total = 0
+    for feicao in geo.get('features', []):
+        geometria = feicao.get('geometry') or {}
+        poligonos = geometria.get('coordinates') or []
+        if geometria.get('type') == 'Polygon': poligonos = [poligonos]
+        elif geometria.get('type') != 'MultiPolygon': continue
+        total += 2 * sum(len(anel) for poligono in poligonos for anel in poligono)
+    return total
+
+def estimar_tamanho(fig):
+    """Bytes aproximados do JSON sem serializar (tende a superestimar)."""
+    valores = 0
+    for trace in fig.data:
+        for atributo in ATRIBUTOS_ARRAY:
+            v = getattr(trace, atributo, None)
+            if v is not None and not isinstance(v, str): valores += np.size(v)
+        cores = getattr(getattr(trace, 'marker', None), 'color', None)
+        if cores is not None and not isinstance(cores, str): valores += np.size(cores)
+        valores += valores_geojson(getattr(trace, 'geojson', None))
+    return BYTES_BASE + valores * BYTES_POR_VALOR
+
+# --- REDUÇÕES ---
+def categorias_valores(trace):
+    return (trace.y, trace.x) if trace.orientation == 'h' else (trace.x, trace.y)
+
+def reduzir_barras(fig, limite):
+    """Top-N categorias pelo total de todas as barras (empilhadas inclusive) e o resto em 'Outros'."""
+    barras = [t for t in fig.data if t.type == 'bar' and all(v is not None for v in categorias_valores(t))
+              and not pd.api.types.is_numeric_dtype(pd.Series(list(categorias_valores(t)[0])))]  # eixo numérico = faixas
+    if not barras: return False
+    totais = pd.concat([pd.Series(np.asarray(v, dtype=float), index=list(c)) for c, v in map(categorias_valores, barras)])
+    totais = totais.groupby(level=0, sort=False).sum()
+    if len(totais) <= TOP_REDUCAO: return False
+    manter = set(totais.nlargest(TOP_REDUCAO).index)
+    for trace in barras:
+        c, v = categorias_valores(trace)
+        s = pd.Series(np.asarray(v, dtype=float), index=[x if x in manter else 'Outros' for x in c]).groupby(level=0, sort=False).sum()
+        cores = trace.marker.color
+        eixo_cat, eixo_val = ('y', 'x') if trace.orientation == 'h' else ('x', 'y')
+        trace.update({eixo_cat: list(s.index), eixo_val: s.to_numpy(), 'text': None})
+        if cores is not None and not isinstance(cores, str): trace.marker.color = s.to_numpy()
+    return True
+
+def histograma_redutivel(trace):
+    """Só contagens simples de um eixo numérico: com y/histfunc (soma, média), histnorm ou faixas próprias o resultado mudaria."""
+    if trace.type != 'histogram' or trace.x is None or trace.y is not None: return False
+    if trace.histfunc not in (None, 'count') or trace.histnorm or trace.xbins.size is not None: return False
+    return pd.api.types.is_numeric_dtype(pd.Series(trace.x))
+
+def reduzir_histogramas(fig, limite):
+    """Histogramas de contagem com as linhas embutidas viram barras com as contagens por faixa."""
+    novos, mudou = [], False
+    for trace in fig.data:
+        if histograma_redutivel(trace):
+            x = pd.Series(trace.x).dropna().to_numpy(dtype=float)
+            contagens, bordas = np.histogram(x, bins=trace.nbinsx or BINS_REDUCAO)
+            trace = go.Bar(x=(bordas[:-1] + bordas[1:]) / 2, y=contagens, width=np.diff(bordas), name=trace.name,
+                           marker_color=trace.marker.color, showlegend=trace.showlegend)
+            mudou = True
+        novos.append(trace)
+    if mudou:
+        fig.data = ()
+        fig.add_traces(novos)
+        fig.update_layout(bargap=0)
+    return mudou
+
+def reduzir_mapas(fig, limite):
+    """Pontos de densidade somados por célula, arredondando as coordenadas até caber no limite."""
+    mudou = False
+    for trace in fig.data:
+        if trace.type != 'densitymapbox' or trace.lat is None: continue
+        n = len(trace.lat)
+        bytes_ponto = tamanho_json(fig)[0] / max(n, 1)
+        df = pd.DataFrame({'lat': np.asarray(trace.lat, dtype=float), 'lon': np.asarray(trace.lon, dtype=float),
+                           'z': np.ones(n) if trace.z is None else np.asarray(trace.z, dtype=float)})
+        for casas in CASAS_REDUCAO_MAPA:
+            celulas = df.round({'lat': casas, 'lon': casas}).groupby(['lat', 'lon'], as_index=False)['z'].sum()
+            if len(celulas) * bytes_ponto <= limite: break
+        if len(celulas) < n:
+            trace.update(lat=celulas['lat'].to_numpy(), lon=celulas['lon'].to_numpy(), z=celulas['z'].to_numpy(), customdata=None, hovertext=None)
+            mudou = True
+    return mudou
+
+def reduzir_dispersoes(fig, limite):
+    """Dispersões em SVG passam para WebGL (scattergl)."""
+    novos, mudou = [], False
+    for trace in fig.data:
+        if trace.type == 'scatter':
+            dados = trace.to_plotly_json()
+            dados.pop('type', None)
+            trace, mudou = go.Scattergl(dados, skip_invalid=True), True
+        novos.append(trace)
+    if mudou:
+        fig.data = ()
+        fig.add_traces(novos)
+    return mudou
+
+REDUCOES = [('top-N', reduzir_barras), ('faixas', reduzir_histogramas), ('células', reduzir_mapas), ('WebGL', reduzir_dispersoes)]
+
+# --- EXIBIÇÃO ---
+def origem_chamada():
+    quadro = sys._getframe(2)
+    return f"{os.path.basename(quadro.f_code.co_filename)}:{quadro.f_lineno} ({quadro.f_code.co_name})"
+
+def exibir_grafico(fig, **kwargs):
+    """st.plotly_chart com medição de payload e redução automática acima de GRAFICO_MAX_KB."""
+    agora = time.perf_counter()
+    preparo = agora - getattr(_marcador, 'inicio', agora)
+    limite = settings.GRAFICO_MAX_KB * 1000
+    if not settings.DEBUG and estimar_tamanho(fig) <= limite / 2:
+        # Longe do limite: sem medição exata (e sem registro, exibido só no painel DEBUG)
+        st.plotly_chart(fig, **kwargs)
+        _marcador.inicio = time.perf_counter()
+        return
+    tamanho, serializacao = tamanho_json(fig)
+    original, aplicadas = tamanho, []
+    if tamanho > limite:
+        aplicadas = [nome for nome, reduzir in REDUCOES if reduzir(fig, limite)]
+        if aplicadas: tamanho, serializacao = tamanho_json(fig)
+    st.plotly_chart(fig, **kwargs)
+    registrar_grafico(origem_chamada(), preparo, serializacao, original, tamanho, aplicadas, tamanho > limite)
+    _marcador.inicio = time.perf_counter()
+
+def registrar_grafico(nome, preparo, serializacao, original, tamanho, reducoes, acima):
+    with _lock:
+        _historico.append({
+            'momento': pd.Timestamp.now(), 'grafico': nome, 'preparo_ms': round(preparo * 1000, 1),
+            'serializacao_ms': round(serializacao * 1000, 1), 'KB': round(tamanho / 1000, 1),
+            'KB_original': round(original / 1000, 1), 'reducao': ', '.join(reducoes), 'acima_do_limite': acima,
+        })
+    if settings.DEBUG or original > settings.GRAFICO_MAX_KB * 1000:
+        status = f" -> {tamanho / 1000:.0f} KB ({', '.join(reducoes)})" if reducoes else " (sem redução aplicável)" if acima else ""
+        print(f"[graficos] {nome}: {original / 1000:.0f} KB{status}, preparo {preparo * 1000:.0f} ms")
+
+def metricas_graficos():
+    """Histórico recente (tamanho e tempos por gráfico) para o painel de desempenho."""
+    with _lock:
+        return pd.DataFrame(list(_historico))
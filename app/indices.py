@@ -0,0 +1,56 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+# --- ÍNDICES POR VALOR (LISTAS ORDENADAS DE LINHAS) ---
+# Para cada dimensão de filtro, as linhas da base agrupadas por valor: ordem[inicio[v]:inicio[v+1]]
+# são as posições (crescentes) das linhas com o valor v. Uma seleção parte da dimensão com menos
+# linhas selecionadas (OR = concatenação das listas dos valores) e confere as demais dimensões só
+# nessas linhas (AND por tabela de códigos permitidos). O custo acompanha o tamanho do resultado.
+
+DIMENSOES_PRF = ['ANO', 'UF', 'BR', 'ESTADO_FISICO', 'MES']
+
+def tipo_minimo(maximo):
+    return np.int8 if maximo < 2**7 else np.int16 if maximo < 2**15 else np.int32
+
+def indexar_coluna(coluna):
+    """Códigos 1..n por valor (0 = nulo), posições das linhas ordenadas por código e início de cada código."""
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        codigos, valores = coluna.cat.codes.to_numpy(), coluna.cat.categories
+    else:
+        codigos, valores = pd.factorize(coluna, sort=True)
+    codigos = (codigos + 1).astype(tipo_minimo(len(valores) + 1))
+    ordem = np.argsort(codigos, kind='stable').astype(np.int32)
+    inicio = np.concatenate([[0], np.cumsum(np.bincount(codigos, minlength=len(valores) + 1))])
+    return {
+        'codigos': codigos, 'ordem': ordem, 'inicio': inicio,
+        'posicao': {str(v): i + 1 for i, v in enumerate(valores)},
+    }
+
+@st.cache_resource(max_entries=2, show_spinner="Indexando filtros...")
+def indice_dataset(nome, versao, _base, dimensoes):
+    """Um índice por processo e versão do dataset (mesmo ciclo de vida da base compartilhada)."""
+    return {d: indexar_coluna(_base[d]) for d in dimensoes if d in _base.columns}
+
+def linhas_selecionadas(indice, selecao):
+    """
+    Posições (crescentes) das linhas que atendem selecao = {dimensão: valores}; dimensões vazias
+    não filtram. Retorna None quando nada filtra.
+    """
+    pedidos = {}
+    for dim, valores in selecao.items():
+        if not valores: continue
+        idx = indice[dim]
+        pedidos[dim] = sorted({idx['posicao'][str(v)] for v in valores if str(v) in idx['posicao']})
+    if not pedidos: return None
+    tamanho = lambda dim: sum(indice[dim]['inicio'][c + 1] - indice[dim]['inicio'][c] for c in pedidos[dim])
+    menor = min(pedidos, key=tamanho)
+    idx = indice[menor]
+    linhas = np.concatenate([idx['ordem'][idx['inicio'][c]:idx['inicio'][c + 1]] for c in pedidos[menor]] or [np.empty(0, np.int32)])
+    if len(pedidos[menor]) > 1: linhas.sort()
+    for dim, codigos in pedidos.items():
+        if dim == menor: continue
+        permitido = np.zeros(len(indice[dim]['posicao']) + 1, dtype=bool)
+        permitido[codigos] = True
+        linhas = linhas[permitido[indice[dim]['codigos'][linhas]]]
+    return linhas
@@ -4,7 +4,15 @@ from PIL import Image
 # Importa as views atualizadas
 from views import produtos, prf, obitos, comparativo 
 # Importa as funções de carregamento do utils.py
-from utils import carregar_dados_gerais, carregar_dados_prf, carregar_dados_obitos, get_tema_config
+from utils import get_tema_config
+from dados import carregar_dados_pagina
+from banco import metricas_consultas, relatorio_memoria, settings
+from versoes import verificar_versoes
+from visoes import estatisticas_visoes
+from coalescencia import estado_coalescencia
+from cache_orcado import uso_cache, total_cache
+from graficos import iniciar_medicao, metricas_graficos
+from aquecimento import iniciar_aquecimento, estado_aquecimento
 
 # 1. Configuração da Página
 st.set_page_config(
@@ -13,6 +21,11 @@ st.set_page_config(
     page_icon="🚦"
 )
 
+# Aquecimento dos caches em segundo plano (no-op se o servidor.py já iniciou)
+iniciar_aquecimento()
+# Tempo de preparo do primeiro gráfico conta a partir daqui (app/graficos.py)
+iniciar_medicao()
+
 # 2. Configuração do Menu Lateral
 st.sidebar.header("⚙️ Configurações")
 
@@ -27,23 +40,52 @@ with col_txt:
     st.write(f"Modo **{tema_selecionado}**")
 
 # --- Botão Limpar Cache ---
-if st.sidebar.button("🔄 Atualizar Dados", help="Recarrega os dados do banco"):
-    st.cache_data.clear()
+if st.sidebar.button("🔄 Atualizar Dados", help="Verifica agora se o ETL publicou novas versões das tabelas"):
+    verificar_versoes()
     st.rerun()
 
+# --- Desempenho das consultas (modo DEBUG) ---
+if settings.DEBUG:
+    with st.sidebar.expander("⏱️ Consultas ao Banco"):
+        df_metricas = metricas_consultas()
+        if not df_metricas.empty:
+            st.dataframe(df_metricas.iloc[::-1], use_container_width=True, hide_index=True)
+    with st.sidebar.expander("📦 Payload dos Gráficos"):
+        df_graficos = metricas_graficos()
+        if not df_graficos.empty:
+            st.caption(f"Limite: {settings.GRAFICO_MAX_KB:,} KB por gráfico")
+            st.dataframe(df_graficos.iloc[::-1], use_container_width=True, hide_index=True)
+    with st.sidebar.expander("🔥 Aquecimento"):
+        st.json(estado_aquecimento())
+    with st.sidebar.expander("🧠 Memória dos Datasets"):
+        df_memoria = relatorio_memoria()
+        if not df_memoria.empty:
+            st.caption(f"Total: {df_memoria['MB'].sum():,.1f} MB em {len(df_memoria)} datasets")
+            st.dataframe(df_memoria, use_container_width=True, hide_index=True)
+        total = total_cache()
+        st.caption(f"Cache dos loaders: {total['MB']:,.1f} de {total['limite_MB']:,} MB em {total['entradas']} entradas")
+        df_cache = uso_cache()
+        if not df_cache.empty: st.dataframe(df_cache, use_container_width=True, hide_index=True)
+        st.caption("Visões filtradas (LRU)")
+        st.json(estatisticas_visoes())
+        st.caption("Cargas coalescidas (versão servida / atualizações em andamento)")
+        st.json(estado_coalescencia())
+
 st.sidebar.divider()
 
 # --- Navegação Atualizada ---
 st.sidebar.subheader("Navegação")
+# Cada página declara os datasets (e colunas) de que precisa
+PAGINAS = {
+    "📊 Painel PNATRANS": produtos.DADOS_VISAO_GERAL,
+    "📈 Análise Temporal": produtos.DADOS_ANALISE_TEMPORAL,
+    "🚗 Sinistros PRF": prf.DADOS_PRF,
+    "🏥 Óbitos (DATASUS)": obitos.DADOS_OBITOS,
+    "⚖️ Comparativo Geral": comparativo.DADOS_COMPARATIVO,
+}
 pagina = st.sidebar.radio(
     "Ir para:", 
-    [
-        "📊 Painel PNATRANS", 
-        "📈 Análise Temporal", 
-        "🚗 Sinistros PRF", 
-        "🏥 Óbitos (DATASUS)",
-        "⚖️ Comparativo Geral" # Nova aba adicionada
-    ],
+    list(PAGINAS),
     label_visibility="collapsed"
 )
 
@@ -114,8 +156,8 @@ st.markdown(f"""
     </style>
 """, unsafe_allow_html=True)
 
-# 4. Carregamento Inicial (Gestão)
-df_mapa, df_org, df_prod, df_status, df_users, df_raw, df_mun = carregar_dados_gerais()
+# 4. Carregamento sob demanda: apenas os datasets da página atual (em paralelo)
+dados, versoes = carregar_dados_pagina(PAGINAS[pagina])
 
 # 5. Header Principal
 c_logo, c_titulo = st.columns([1, 8])
@@ -136,25 +178,19 @@ st.divider()
 
 # 6. Roteamento de Páginas
 if pagina == "📊 Painel PNATRANS":
-    produtos.render_visao_geral(df_mapa, df_org, df_prod, df_status, cfg, df_mun, df_users)
+    produtos.render_visao_geral(dados['mapa'], dados['org'], dados['prod'], dados['status'], cfg, dados['mun'], dados['users'])
 
 elif pagina == "📈 Análise Temporal":
-    # Passamos df_raw para análise temporal também, pois ele tem as datas detalhadas
-    produtos.render_analise_temporal(df_raw, cfg)
+    # produtos_mensal: cadastros já agregados por mês, UF, status e produto
+    produtos.render_analise_temporal(dados['mensal'], cfg)
 
 elif pagina == "🚗 Sinistros PRF":
-    df_prf = carregar_dados_prf()
-    prf.render_prf(df_prf, cfg)
+    # A página PRF consulta o banco já com os filtros da barra lateral
+    prf.render_prf(cfg)
 
 elif pagina == "🏥 Óbitos (DATASUS)":
-    df_obitos = carregar_dados_obitos()
-    obitos.render_obitos(df_obitos, cfg)
+    obitos.render_obitos(dados['obitos'], cfg)
 
 elif pagina == "⚖️ Comparativo Geral":
-    # Carrega dados necessários para o cruzamento de informações
-    # Precisamos da base de sinistros da PRF, não dos óbitos DATASUS
-    df_prf = carregar_dados_prf()
-    
-    # ATENÇÃO: Passamos df_raw (tabela bruta de produtos) em vez de df_prod
-    # df_raw contém as colunas de data/ano necessárias para o eixo X do gráfico
-    comparativo.render_comparativo(df_raw, df_prf, cfg)
\ No newline at end of file
+    # Cruza produtos (df_raw, com as datas para o eixo X) com a base de sinistros da PRF
+    comparativo.render_comparativo(dados['raw'], dados['prf'], cfg, (versoes['raw'], versoes['prf']))
\ No newline at end of file
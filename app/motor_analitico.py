@@ -0,0 +1,139 @@
+import streamlit as st
+import pandas as pd
+import pyarrow as pa
+import threading
+import time
+from banco import settings
+
+try:
+    import duckdb
+except ImportError:  # opcional: sem o pacote, tudo roda em pandas
+    duckdb = None
+
+# --- MOTOR ANALÍTICO (PANDAS OU DUCKDB) ---
+# agregar()/contar() devolvem só os agregados pequenos que os gráficos usam (contagens, somas por
+# grupo): página de Óbitos e grade do mapa PRF. Com MOTOR_ANALITICO=duckdb eles rodam como SQL num
+# DuckDB embutido e multithread, lendo o frame em memória via Arrow (sem cópia para colunas
+# numéricas e strings Arrow). O pacote de agregados das abas PRF não passa por aqui: sai de
+# agregados.calcular_agregados (numpy, uma passada), cujas condições e derivadas são funções Python.
+# As duas implementações devolvem o mesmo resultado: chaves nulas ficam de fora, ordem por
+# valor decrescente e, nos empates, pela chave (ver comparar_motores).
+
+FUNCOES_SQL = {'sum': 'SUM({c})', 'mean': 'AVG({c})', 'nunique': 'COUNT(DISTINCT {c})', 'size': 'COUNT(*)'}
+_aviso_fallback = threading.Event()
+
+@st.cache_resource(show_spinner=False)
+def obter_duckdb():
+    """Uma conexão em memória por processo; cada consulta usa um cursor próprio (thread-safe)."""
+    return duckdb.connect(config={'threads': settings.DUCKDB_THREADS})
+
+def usar_duckdb(motor=None):
+    return (motor or settings.MOTOR_ANALITICO) == 'duckdb' and duckdb is not None
+
+def consultar_duckdb(df, colunas, sql):
+    """Registra só as colunas usadas como tabela Arrow 'dados' e executa o SQL."""
+    tabela = pa.Table.from_pandas(df[list(dict.fromkeys(colunas))], preserve_index=False)
+    cursor = obter_duckdb().cursor()
+    try:
+        cursor.register('dados', tabela)
+        return cursor.execute(sql).df()
+    finally:
+        cursor.close()
+
+def ordenar(df, chaves, valor, top=None):
+    df = df.sort_values([valor] + chaves, ascending=[False] + [True] * len(chaves), kind='stable', ignore_index=True)
+    return df.head(top) if top else df
+
+def tipos_resultado(df, medidas):
+    """Tipos do resultado iguais aos do pandas (SUM/COUNT do DuckDB chegam como HUGEINT/float)."""
+    tipos = {}
+    for nome, (coluna, funcao) in medidas.items():
+        if funcao in ('nunique', 'size'): tipos[nome] = 'int64'
+        elif funcao == 'mean': tipos[nome] = 'float64'
+        elif pd.api.types.is_integer_dtype(df[coluna].dtype): tipos[nome] = 'int64'
+        else: tipos[nome] = 'float64'
+    return tipos
+
+def agregar_pandas(df, chaves, medidas):
+    if not chaves:
+        linha = {n: (len(df) if f == 'size' else getattr(df[c], f)()) for n, (c, f) in medidas.items()}
+        return pd.DataFrame([linha])
+    base = df.dropna(subset=chaves)
+    grupos = base.groupby(chaves, observed=True, sort=False)
+    partes = {n: (grupos.size() if f == 'size' else grupos[c].agg(f)) for n, (c, f) in medidas.items()}
+    res = pd.DataFrame(partes).reset_index()
+    for chave in chaves:
+        if isinstance(res[chave].dtype, pd.CategoricalDtype): res[chave] = res[chave].astype(str)
+    return res
+
+def agregar_sql(df, chaves, medidas):
+    selecao = [f'"{c}"' for c in chaves]
+    selecao += [FUNCOES_SQL[f].format(c=f'"{c}"') + f' AS "{n}"' for n, (c, f) in medidas.items()]
+    colunas = chaves + [c for c, f in medidas.values() if f != 'size'] or list(df.columns[:1])
+    sql = f"SELECT {', '.join(selecao)} FROM dados"
+    if chaves:
+        sql += " WHERE " + " AND ".join(f'"{c}" IS NOT NULL' for c in chaves)
+        sql += " GROUP BY " + ", ".join(f'"{c}"' for c in chaves)
+    res = consultar_duckdb(df, colunas, sql)
+    for chave in chaves:
+        if not pd.api.types.is_numeric_dtype(res[chave].dtype): res[chave] = res[chave].astype(str)
+    return res
+
+def agregar(df, chaves, top=None, motor=None, **medidas):
+    """
+    groupby(chaves).agg(nome=(coluna, funcao)) com funcao em sum/mean/nunique/size.
+    Sem chaves devolve uma linha com os totais. Ordena pela primeira medida (decrescente).
+    'motor' ('pandas'/'duckdb') substitui settings.MOTOR_ANALITICO nesta chamada.
+    """
+    chaves = list(chaves)
+    res = None
+    if usar_duckdb(motor) and not df.empty:
+        try: res = agregar_sql(df, chaves, medidas)
+        except Exception as e:  # tipo não suportado, versão antiga etc.: segue em pandas
+            if not _aviso_fallback.is_set():
+                _aviso_fallback.set()
+                print(f"[motor] DuckDB indisponível para esta consulta, usando pandas: {e}")
+    if res is None: res = agregar_pandas(df, chaves, medidas)
+    res = res.astype(tipos_resultado(df, medidas))
+    return ordenar(res, chaves, next(iter(medidas)), top) if chaves else res
+
+def contar(df, coluna, top=None, excluir=(), motor=None):
+    """Equivalente ao value_counts: colunas [coluna, 'count']."""
+    if excluir: df = df[~df[coluna].isin(list(excluir))]
+    return agregar(df, [coluna], top=top, motor=motor, count=(coluna, 'size'))
+
+# --- COMPARAÇÃO ENTRE OS MOTORES ---
+CONSULTAS_BENCHMARK_PRF = {
+    'kpis': lambda df, m: agregar(df, [], motor=m, pessoas=('ID', 'size'), sinistros=('ID', 'nunique'), mortos=('MORTOS', 'sum')),
+    'sexo': lambda df, m: contar(df, 'SEXO', excluir=['NÃO INFORMADO'], motor=m),
+    'tipo_veiculo': lambda df, m: contar(df, 'TIPO_VEICULO', top=10, motor=m),
+    'causa': lambda df, m: contar(df, 'CAUSA_PRINCIPAL', top=10, motor=m),
+    'uf': lambda df, m: contar(df, 'UF', motor=m),
+    'municipios': lambda df, m: agregar(df, ['MUNICIPIO', 'UF'], motor=m, Qtd=('ID', 'size')),
+    'celulas': lambda df, m: agregar(df, ['CELULA_N3'], motor=m, ACIDENTES=('ID', 'nunique'), LAT_C=('LAT', 'mean'), MORTOS=('MORTOS', 'sum')),
+}
+
+def comparar_motores(df, consultas=CONSULTAS_BENCHMARK_PRF, repeticoes=5):
+    """
+    Executa cada consulta (df, motor) nos dois motores, confere resultados idênticos e mede o tempo
+    médio (ms). O motor vai por parâmetro: sessões rodando ao mesmo tempo seguem com o configurado.
+    """
+    if duckdb is None: raise RuntimeError("duckdb não instalado (pip install duckdb)")
+    linhas = []
+    for nome, consulta in consultas.items():
+        tempos, resultados = {}, {}
+        for motor in ('pandas', 'duckdb'):
+            inicio = time.perf_counter()
+            for _ in range(repeticoes): resultados[motor] = consulta(df, motor)
+            tempos[motor] = (time.perf_counter() - inicio) / repeticoes * 1000
+        pd.testing.assert_frame_equal(resultados['pandas'], resultados['duckdb'], check_dtype=False, rtol=1e-5)
+        linhas.append({'consulta': nome, 'pandas_ms': round(tempos['pandas'], 1), 'duckdb_ms': round(tempos['duckdb'], 1),
+                       'ganho': round(tempos['pandas'] / tempos['duckdb'], 2), 'linhas_resultado': len(resultados['pandas'])})
+    return pd.DataFrame(linhas)
+
+if __name__ == "__main__":
+    # python app/motor_analitico.py  -> benchmark sobre a base PRF completa do banco
+    from utils import ler_prf, normalizar_filtros_prf
+    base = ler_prf(normalizar_filtros_prf())
+    print(f"Base PRF: {len(base):,} linhas")
+    print(comparar_motores(base).to_string(index=False))
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from regioes import REGIAO_UF, SIGLA_UF, BRASIL
+
+# --- DENOMINADORES DE POPULAÇÃO ---
+# Montados uma vez por versão de populacao_ibge: população por município (código IBGE e, sem ele,
+# nome + UF) e as somas por UF, região e Brasil. Com a coluna 'ano' na tabela há um conjunto por
+# ano; sem ela, um único conjunto de referência. As páginas consultam com Series/arrays
+# (reindex vetorizado) em vez de reagrupar e fazer merge da tabela de população a cada render.
+
+def normalizar(valores):
+    return pd.Series(valores, dtype='object').astype(str).str.upper().str.strip()
+
+def montar_conjunto(df):
+    df = df[df['populacao'] > 0]
+    uf = df.groupby(normalizar(df['uf']).map(SIGLA_UF).to_numpy())['populacao'].sum()
+    conjunto = {
+        'municipio_nome': df.groupby([normalizar(df['municipio']).to_numpy(), normalizar(df['uf']).to_numpy()])['populacao'].sum(),
+        'uf': uf,
+        'regiao': uf.groupby(uf.index.map(REGIAO_UF)).sum(),
+        'brasil': int(uf.sum()),
+    }
+    if 'id_ibge' in df.columns:
+        com_codigo = df.dropna(subset=['id_ibge'])
+        conjunto['municipio'] = com_codigo.groupby(com_codigo['id_ibge'].astype('int64').to_numpy())['populacao'].sum()
+    return conjunto
+
+def montar_denominadores(df):
+    """{ano ou None: conjunto}; 'anos' lista os anos disponíveis (vazia sem a coluna 'ano')."""
+    if df.empty: return {'anos': [], None: None}
+    if 'ano' not in df.columns: return {'anos': [], None: montar_conjunto(df)}
+    anos = sorted(int(a) for a in df['ano'].dropna().unique())
+    return {'anos': anos, **{ano: montar_conjunto(df[df['ano'] == ano]) for ano in anos}}
+
+def ano_referencia(denominadores, ano=None):
+    """Ano usado para 'ano': ele mesmo, o mais recente anterior a ele ou, sem anos anteriores, o primeiro."""
+    anos = denominadores['anos']
+    if not anos: return None
+    if ano is None: return anos[-1]
+    anteriores = [a for a in anos if a <= int(ano)]
+    return anteriores[-1] if anteriores else anos[0]
+
+def disponivel(denominadores, nivel='uf'):
+    conjunto = denominadores[ano_referencia(denominadores)]
+    return conjunto is not None and nivel in conjunto and len(conjunto[nivel]) > 0
+
+def denominador(denominadores, nivel, chaves=None, ano=None):
+    """
+    População alinhada com 'chaves' (array float, NaN quando não encontrada). nivel:
+    'municipio' (código IBGE), 'municipio_nome' (pares nome/UF), 'uf' (sigla ou nome), 'regiao',
+    'local' (UF, região ou BRASIL misturados, como na tabela de óbitos) ou 'brasil' (escalar).
+    """
+    conjunto = denominadores[ano_referencia(denominadores, ano)]
+    if nivel == 'brasil': return conjunto['brasil']
+    if nivel == 'municipio':
+        return conjunto['municipio'].reindex(pd.Series(chaves).astype('int64')).to_numpy(dtype=float)
+    if nivel == 'municipio_nome':
+        municipios, ufs = chaves
+        return conjunto['municipio_nome'].reindex(pd.MultiIndex.from_arrays([normalizar(municipios), normalizar(ufs)])).to_numpy(dtype=float)
+    nomes = normalizar(chaves)
+    por_uf = conjunto['uf'].reindex(nomes.map(SIGLA_UF)).to_numpy(dtype=float)
+    if nivel == 'uf': return por_uf
+    por_regiao = conjunto['regiao'].reindex(nomes).to_numpy(dtype=float)
+    if nivel == 'regiao': return por_regiao
+    por_local = np.where(np.isnan(por_uf), por_regiao, por_uf)
+    return np.where(nomes.to_numpy() == BRASIL, conjunto['brasil'], por_local)
+
+def taxa(valores, populacao, por=100_000):
+    """Taxa por 'por' habitantes; NaN onde não há população."""
+    populacao = np.asarray(populacao, dtype=float)
+    return np.asarray(valores, dtype=float) / np.where(populacao > 0, populacao, np.nan) * por
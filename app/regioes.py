@@ -0,0 +1,28 @@
+import unicodedata
+
+# --- HIERARQUIA GEOGRÁFICA (UF -> REGIÃO -> BRASIL) ---
+# Regiões com o código do IBGE e as UFs (sigla, nome). BRASIL recebe o código 0.
+
+REGIOES = {
+    'NORTE': (1, {'RO': 'RONDÔNIA', 'AC': 'ACRE', 'AM': 'AMAZONAS', 'RR': 'RORAIMA', 'PA': 'PARÁ', 'AP': 'AMAPÁ', 'TO': 'TOCANTINS'}),
+    'NORDESTE': (2, {'MA': 'MARANHÃO', 'PI': 'PIAUÍ', 'CE': 'CEARÁ', 'RN': 'RIO GRANDE DO NORTE', 'PB': 'PARAÍBA',
+                     'PE': 'PERNAMBUCO', 'AL': 'ALAGOAS', 'SE': 'SERGIPE', 'BA': 'BAHIA'}),
+    'SUDESTE': (3, {'MG': 'MINAS GERAIS', 'ES': 'ESPÍRITO SANTO', 'RJ': 'RIO DE JANEIRO', 'SP': 'SÃO PAULO'}),
+    'SUL': (4, {'PR': 'PARANÁ', 'SC': 'SANTA CATARINA', 'RS': 'RIO GRANDE DO SUL'}),
+    'CENTRO-OESTE': (5, {'MS': 'MATO GROSSO DO SUL', 'MT': 'MATO GROSSO', 'GO': 'GOIÁS', 'DF': 'DISTRITO FEDERAL'}),
+}
+BRASIL = 'BRASIL'
+LOCAIS_AGREGADOS = [*REGIOES, BRASIL]
+
+def sem_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+# Sigla, nome e nome sem acento (maiúsculos) -> sigla da UF
+SIGLA_UF = {chave: sigla for _, ufs in REGIOES.values() for sigla, nome in ufs.items()
+            for chave in (sigla, nome, sem_acentos(nome))}
+# Sigla da UF -> região
+REGIAO_UF = {sigla: regiao for regiao, (_, ufs) in REGIOES.items() for sigla in ufs}
+
+def regiao_local(local):
+    """Região de uma UF (sigla ou nome, em maiúsculas); 'OUTROS' quando não é uma UF."""
+    return REGIAO_UF.get(SIGLA_UF.get(local), 'OUTROS')
@@ -0,0 +1,14 @@
+import os
+import sys
+from streamlit.web import bootstrap
+from aquecimento import iniciar_aquecimento
+
+# --- LANÇADOR COM AQUECIMENTO ---
+# Uso: python app/servidor.py  (porta e demais opções via .streamlit/config.toml ou STREAMLIT_SERVER_PORT etc.)
+# Com 'streamlit run app/main.py' o aquecimento só começa na primeira sessão; aqui ele começa junto
+# com o servidor, e o endpoint de prontidão (HOST_PRONTIDAO:PORTA_PRONTIDAO) responde 503 até os caches estarem prontos.
+
+if __name__ == "__main__":
+    iniciar_aquecimento(prontidao=True)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    bootstrap.run(script, 'streamlit run', sys.argv[1:], {})
@@ -0,0 +1,119 @@
+import streamlit as st
+import pandas as pd
+import os
+import threading
+from contextlib import contextmanager
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from banco import settings, registrar_memoria
+try: import fcntl
+except ImportError: fcntl = None  # Windows: sem trava entre processos (cada um publica o seu; os.replace mantém atômico)
+
+# --- SNAPSHOTS ARROW COMPARTILHADOS ---
+# Datasets grandes são publicados uma vez como arquivos Arrow IPC (sem compressão) e abertos
+# via memory map: sessões do mesmo processo recebem o mesmo objeto (st.cache_resource, sem
+# pickle/cópia como no st.cache_data) e processos do mesmo host compartilham as páginas do
+# arquivo no page cache do SO. Um processo reiniciado só anexa ao arquivo, sem consultar o banco.
+# O nome do arquivo leva a versão da tabela carimbada pelo ETL (versoes.py): versão nova, arquivo novo.
+
+def caminho_snapshot(nome, versao):
+    return os.path.join(settings.SNAPSHOT_DIR, f"{nome}.{versao}.arrow")
+
+def ordem_versao(versao):
+    """Chave de ordenação: carimbos do ETL (inteiros) vêm depois das janelas de tabelas sem carimbo."""
+    if versao.isdigit(): return (1, int(versao))
+    prefixo, _, numero = versao.rpartition('-')
+    return (0, int(numero)) if prefixo == 'janela' and numero.isdigit() else None
+
+def remover_versoes_antigas(nome, versao):
+    """
+    Remove só os snapshots de versões anteriores à publicada: um processo com a lista de versões
+    atrasada não apaga o que outro acabou de publicar. As travas (.lock, vazias) ficam: outro
+    processo pode estar esperando nelas. Quem ainda mapeia um arquivo removido continua lendo
+    (o inode só some quando soltar).
+    """
+    atual = ordem_versao(versao)
+    if atual is None: return
+    try: arquivos = os.listdir(settings.SNAPSHOT_DIR)
+    except OSError: return
+    for arquivo in arquivos:
+        if not (arquivo.startswith(f"{nome}.") and arquivo.endswith('.arrow')): continue
+        outra = ordem_versao(arquivo[len(nome) + 1:-len('.arrow')])
+        if outra is None or outra >= atual: continue
+        try: os.remove(os.path.join(settings.SNAPSHOT_DIR, arquivo))
+        except FileNotFoundError: pass  # outro processo já removeu
+        except OSError as e: print(f"[snapshot] {arquivo} não removido: {e}")
+
+def publicar_snapshot(nome, versao, df):
+    """Grava o snapshot de forma atômica (arquivo temporário + os.replace): leitores nunca veem arquivo parcial."""
+    os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+    destino = caminho_snapshot(nome, versao)
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    try:
+        with pa.OSFile(temporario, 'wb') as arquivo, ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario): os.remove(temporario)
+
+@contextmanager
+def trava_publicacao(nome, versao):
+    """Trava de arquivo por (dataset, versão): só um processo do host consulta o banco e publica."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+    with open(f"{caminho_snapshot(nome, versao)}.lock", 'w') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)  # liberada ao fechar, inclusive se o processo morrer
+        try: yield
+        finally: fcntl.flock(trava, fcntl.LOCK_UN)
+
+def abrir_snapshot(nome, versao):
+    """
+    Mapeia o arquivo em memória. Colunas numéricas e strings Arrow apontam direto para o arquivo
+    (somente leitura); apenas os códigos das categorias são materializados.
+    """
+    tabela = ipc.open_file(pa.memory_map(caminho_snapshot(nome, versao), 'r')).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+@st.cache_resource(max_entries=8, show_spinner="Anexando base compartilhada...")
+def dataset_compartilhado(nome, versao, _carregar):
+    """
+    Uma instância por processo e versão: anexa ao snapshot da versão ou carrega do banco, publica e anexa.
+    O DataFrame é o mesmo para todas as sessões: quem precisar alterá-lo deve copiar antes.
+    """
+    carregado, publicado, df = [], False, None
+    def carregar():
+        # O banco é consultado no máximo uma vez, mesmo com nova tentativa ou fallback
+        if not carregado: carregado.append(_carregar())
+        return carregado[0]
+
+    for tentativa in range(2):
+        try:
+            if not os.path.exists(caminho_snapshot(nome, versao)):
+                with trava_publicacao(nome, versao):
+                    # Outro processo pode ter publicado enquanto esperávamos a trava
+                    if not os.path.exists(caminho_snapshot(nome, versao)):
+                        publicar_snapshot(nome, versao, carregar())
+                        publicado = True
+            df = abrir_snapshot(nome, versao)
+            break
+        except FileNotFoundError:
+            # Removido entre a checagem e a abertura (versão antiga limpa por outro processo): tenta de novo
+            continue
+        except (OSError, pa.ArrowException) as e:
+            print(f"[snapshot] {nome}: {e}")
+            break
+    if df is None:
+        # Sem disco/arquivo corrompido: mantém uma cópia só deste processo
+        print(f"[snapshot] {nome}: usando cópia em memória do processo")
+        df = carregar()
+    if publicado: remover_versoes_antigas(nome, versao)
+    registrar_memoria(f"{nome} (compartilhado)", df)
+    return df
+
+def visao_colunas(df, colunas=None):
+    """Subconjunto de colunas sem copiar os dados (df[lista] copiaria)."""
+    if not colunas: return df.copy(deep=False)
+    return pd.DataFrame({c: df[c] for c in colunas}, copy=False)
@@ -0,0 +1,28 @@
+import streamlit as st
+import time
+from banco import consultar, ErroBanco, settings
+
+# --- VERSÕES DAS TABELAS (CARIMBADAS PELO ETL) ---
+# Cada ETL grava (tabela, versao) em 'etl_versoes' (scripts/versoes_etl.py). Os loaders recebem
+# a versão da tabela como argumento: a chave do cache só muda quando aquela tabela foi recarregada,
+# e as entradas não expiram por tempo.
+
+@st.cache_data(ttl=settings.VERSAO_INTERVALO, show_spinner=False)
+def versoes_tabelas():
+    """Leitura barata (uma linha por tabela), repetida no máximo a cada VERSAO_INTERVALO segundos."""
+    try: df = consultar("SELECT tabela, versao FROM etl_versoes", 'etl_versoes')
+    except ErroBanco: return {}
+    return {tabela: int(v) for tabela, v in zip(df['tabela'], df['versao'])}
+
+def janela_atual(tabela=None):
+    """Janela de validade de uma tabela sem carimbo (TTL_SEM_CARIMBO ou CACHE_TTL_SEM_CARIMBO segundos)."""
+    return int(time.time() // settings.TTL_SEM_CARIMBO.get(tabela, settings.CACHE_TTL_SEM_CARIMBO))
+
+def versao(tabela):
+    """Carimbo do ETL; tabelas ainda sem carimbo expiram pela janela de janela_atual(tabela)."""
+    carimbo = versoes_tabelas().get(tabela)
+    return str(carimbo) if carimbo else f"janela-{janela_atual(tabela)}"
+
+def verificar_versoes():
+    """Botão 'Atualizar Dados': refaz a checagem agora; só os datasets com versão nova são recarregados."""
+    versoes_tabelas.clear()
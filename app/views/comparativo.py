@@ -2,7 +2,16 @@ import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
 from utils import padronizar_grafico
+from graficos import exibir_grafico
+from cache_orcado import cache_orcado
+
+# Produtos (gestão) e PRF: apenas as colunas usadas no cruzamento
+DADOS_COMPARATIVO = {
+    'raw': ['UF_LIMPA', 'MUNICIPIO_LIMPO', 'STATUS_LIMPO', 'DATA_CADASTRO', 'COD_IBGE'],
+    'prf': ['UF', 'MUNICIPIO', 'MORTOS', 'ANO', 'COD_IBGE'],
+}
 
 # Dicionário de normalização para garantir que nomes de estados virem siglas padrão
 MAPA_ESTADOS = {
@@ -25,77 +34,106 @@ def normalizar_texto(texto):
     nfkd = unicodedata.normalize('NFKD', s)
     return "".join([c for c in nfkd if not unicodedata.combining(c)])
 
-def render_comparativo(df_prod_raw, df_prf_raw, tema):
+# --- CUBO (UF, MUNICÍPIO, ANO) ---
+# Montado uma vez por versão dos dois datasets; cada seleção da página é uma busca no índice.
+TODOS = '*'                 # UF = '*': Brasil; MUNICIPIO = '*': a UF inteira
+ANOS_COMPARATIVO = (2018, 2026)
+
+def normalizar_nomes(serie):
+    """normalizar_texto por valor distinto, não por linha."""
+    unicos = serie.dropna().unique()
+    return serie.map(dict(zip(unicos, map(normalizar_texto, unicos)))).fillna("")
+
+def somar_niveis(df, medida, municipios):
+    """Níveis Brasil e UF (soma de 'medida' ou contagem de linhas) junto com os valores por município."""
+    def agrupar(chaves):
+        grupos = df.groupby(chaves + ['ANO'], observed=True)
+        return (grupos.size() if medida is None else grupos[medida].sum()).rename('valor').reset_index()
+    return pd.concat([
+        agrupar([]).assign(UF=TODOS, MUNICIPIO=TODOS),
+        agrupar(['UF']).assign(MUNICIPIO=TODOS),
+        municipios,
+    ], ignore_index=True)
+
+def montar_cubo(df_prod, df_prf):
+    """METAS (produtos realizados) e OBITOS_PRF por (UF, MUNICIPIO, ANO), com os níveis UF e Brasil."""
+    if 'STATUS_LIMPO' in df_prod.columns: df_prod = df_prod[df_prod['STATUS_LIMPO'] == 'REALIZADO']
+    p = pd.DataFrame({
+        'UF': df_prod['UF_LIMPA'].to_numpy(), 'MUNICIPIO': df_prod['MUNICIPIO_LIMPO'].to_numpy(),
+        'ANO': df_prod['DATA_CADASTRO'].dt.year.to_numpy(),
+        'COD_IBGE': df_prod['COD_IBGE'].to_numpy() if 'COD_IBGE' in df_prod.columns else np.nan,
+    })
+    opcoes = p[['UF', 'MUNICIPIO']].dropna(subset=['UF']).drop_duplicates()
+    pares = opcoes.dropna(subset=['MUNICIPIO'])
+    datados = p.dropna(subset=['ANO'])
+    metas = datados.dropna(subset=['MUNICIPIO']).groupby(['UF', 'MUNICIPIO', 'ANO']).size().rename('valor').reset_index()
+
+    f = pd.DataFrame({'UF': df_prf['UF'].astype(str).to_numpy(), 'ANO': df_prf['ANO'].to_numpy(), 'MORTOS': df_prf['MORTOS'].to_numpy()})
+    # Município: pelo código IBGE dos produtos (na mesma UF) ou, sem código, pelo nome normalizado.
+    # O schema grava o código não resolvido como 0 (não nulo): COD_IBGE <= 0 segue pelo nome, como o 'com_ibge' da PRF
+    cods = p[p['MUNICIPIO'].notna() & (p['COD_IBGE'] > 0)][['UF', 'MUNICIPIO', 'COD_IBGE']].drop_duplicates()
+    if 'COD_IBGE' not in df_prf.columns: cods = cods.iloc[:0]
+    por_cod = pd.DataFrame(columns=['UF', 'MUNICIPIO', 'ANO', 'valor'])
+    if not cods.empty:
+        f_cod = f.assign(COD_IBGE=df_prf['COD_IBGE'].to_numpy())
+        mortos_cod = f_cod[f_cod['COD_IBGE'] > 0].groupby(['UF', 'COD_IBGE', 'ANO'])['MORTOS'].sum().rename('valor').reset_index()
+        por_cod = cods.merge(mortos_cod, on=['UF', 'COD_IBGE']).groupby(['UF', 'MUNICIPIO', 'ANO'])['valor'].sum().reset_index()
+    sem_cod = pares.merge(cods[['UF', 'MUNICIPIO']].drop_duplicates(), how='left', indicator=True)
+    sem_cod = sem_cod[sem_cod['_merge'] == 'left_only'].drop(columns='_merge').assign(NOME=lambda d: normalizar_nomes(d['MUNICIPIO']))
+    mortos_nome = f.assign(NOME=normalizar_nomes(df_prf['MUNICIPIO'].astype(object)).to_numpy()).groupby(['UF', 'NOME', 'ANO'])['MORTOS'].sum().rename('valor').reset_index()
+    por_nome = sem_cod.merge(mortos_nome, on=['UF', 'NOME']).drop(columns='NOME')
+
+    chaves = ['UF', 'MUNICIPIO', 'ANO']
+    cubo = pd.merge(somar_niveis(datados, None, metas).rename(columns={'valor': 'METAS'}),
+                    somar_niveis(f, 'MORTOS', pd.concat([por_cod, por_nome], ignore_index=True)).rename(columns={'valor': 'OBITOS_PRF'}),
+                    on=chaves, how='outer').fillna({'METAS': 0, 'OBITOS_PRF': 0})
+    cubo['ANO'] = cubo['ANO'].astype(int)
+    cubo = cubo[cubo['ANO'].between(*ANOS_COMPARATIVO)].astype({'METAS': int, 'OBITOS_PRF': int})
+    return {'cubo': cubo.set_index(['UF', 'MUNICIPIO']).sort_index()[['ANO', 'METAS', 'OBITOS_PRF']],
+            'opcoes': opcoes.sort_values(['UF', 'MUNICIPIO']).reset_index(drop=True)}
+
+@cache_orcado('comparativo (cubo)', max_entries=2)
+def cubo_comparativo(versao_produtos, versao_prf, _df_prod, _df_prf):
+    return montar_cubo(_df_prod, _df_prf)
+
+def render_comparativo(df_prod_raw, df_prf_raw, tema, versoes):
     st.markdown("### ⚖️ Comparativo PNATRANS vs. Vítimas Fatais (PRF)")
     st.info("Este painel cruza o volume de metas entregues com o total de mortos registrados pela PRF em rodovias federais.")
 
     if df_prod_raw.empty or df_prf_raw.empty:
         st.warning("⚠️ Dados insuficientes no banco para gerar a comparação.")
         return
-
-    # --- 1. PREPARAÇÃO DOS DATASETS (Conforme memorizado do render_prf) ---
-    # Produtos PNATRANS
-    df_p = df_prod_raw.copy()
-    df_p.columns = [c.upper() for c in df_p.columns]
-    if 'STATUS_LIMPO' in df_p.columns:
-        df_p = df_p[df_p['STATUS_LIMPO'] == 'REALIZADO']
-
-    # Dados PRF
-    df_prf = df_prf_raw.copy()
-    df_prf.columns = [c.upper() for c in df_prf.columns]
-    if 'MORTOS' not in df_prf.columns:
+    if 'MORTOS' not in df_prf_raw.columns:
         st.warning("⚠️ O conjunto de dados PRF não contém a coluna 'MORTOS'. Não é possível gerar o comparativo.")
         return
-    df_prf['MORTOS'] = pd.to_numeric(df_prf['MORTOS'], errors='coerce').fillna(0)
+
+    # --- 1. CUBO DO CRUZAMENTO (uma vez por versão dos dados) ---
+    # 'versoes' (produtos, PRF) vêm da mesma carga dos frames (dados.carregar_dados_pagina)
+    cubo = cubo_comparativo(*versoes, df_prod_raw, df_prf_raw)
+    opcoes = cubo['opcoes']
 
     # --- 2. SIDEBAR: FILTROS INTEGRADOS ---
     st.sidebar.divider()
     st.sidebar.subheader("🎯 Filtros de Cruzamento")
     
-    col_uf_p = 'UF_LIMPA' if 'UF_LIMPA' in df_p.columns else 'UF'
-    col_mun_p = 'MUNICIPIO_LIMPO' if 'MUNICIPIO_LIMPO' in df_p.columns else 'MUNICIPIO'
-    
     # Lista de UFs baseada nos dados de gestão
-    lista_ufs = sorted(df_p[col_uf_p].dropna().unique())
+    lista_ufs = list(opcoes['UF'].unique())
     sel_uf = st.sidebar.selectbox("🗺️ Selecione a UF:", ["BRASIL (Todas as BRs)"] + lista_ufs)
 
     sel_mun = "Todos os Municípios"
     if sel_uf != "BRASIL (Todas as BRs)":
-        muns_disponiveis = sorted(df_p[df_p[col_uf_p] == sel_uf][col_mun_p].dropna().unique())
+        muns_disponiveis = list(opcoes.loc[opcoes['UF'] == sel_uf, 'MUNICIPIO'].dropna())
         sel_mun = st.sidebar.selectbox("🏙️ Selecione o Município:", ["Todos os Municípios"] + muns_disponiveis)
 
-    # --- 3. APLICAÇÃO DA LÓGICA DE FILTRAGEM ---
+    # --- 3. SELEÇÃO NO CUBO ---
     titulo_local = "Brasil (Visão Consolidada)"
-    
+    chave = (TODOS, TODOS)
     if sel_uf != "BRASIL (Todas as BRs)":
-        df_p = df_p[df_p[col_uf_p] == sel_uf]
-        df_prf = df_prf[df_prf['UF'] == sel_uf]
-        titulo_local = f"Rodovias Federais em {sel_uf}"
-        
+        chave, titulo_local = (sel_uf, TODOS), f"Rodovias Federais em {sel_uf}"
         if sel_mun != "Todos os Municípios":
-            df_p = df_p[df_p[col_mun_p] == sel_mun]
-            # Normalização de texto para garantir o match (PRF costuma vir sem acentos)
-            df_prf['_MUN_NORM'] = df_prf['MUNICIPIO'].apply(normalizar_texto)
-            df_prf = df_prf[df_prf['_MUN_NORM'] == normalizar_texto(sel_mun)]
-            titulo_local = f"Município: {sel_mun} / {sel_uf}"
-
-    # --- 4. PROCESSAMENTO TEMPORAL (AGRUPAMENTO POR ANO) ---
-    # Produtos: Extração de ano da coluna de data
-    col_data_p = 'DATA_CADASTRO' if 'DATA_CADASTRO' in df_p.columns else 'DATA'
-    df_p['ANO_REF'] = pd.to_datetime(df_p[col_data_p], errors='coerce', dayfirst=True).dt.year
-    df_p_ano = df_p.dropna(subset=['ANO_REF']).groupby('ANO_REF').size().reset_index(name='METAS')
-    df_p_ano.rename(columns={'ANO_REF': 'ANO'}, inplace=True)
-
-    # PRF: Agrupamento da soma de mortos por ano
-    # (Se o arquivo PRF já tiver a coluna ANO, usamos ela; se não, extraímos da DATA_INVERSA)
-    if 'ANO' not in df_prf.columns and 'DATA_INVERSA' in df_prf.columns:
-        df_prf['ANO'] = pd.to_datetime(df_prf['DATA_INVERSA'], errors='coerce').dt.year
-    
-    df_prf_ano = df_prf.groupby('ANO')['MORTOS'].sum().reset_index(name='OBITOS_PRF')
-    
-    # --- 5. UNIÃO E CÁLCULOS ---
-    df_comp = pd.merge(df_p_ano, df_prf_ano, on='ANO', how='outer').fillna(0).sort_values('ANO')
-    df_comp = df_comp[(df_comp['ANO'] >= 2018) & (df_comp['ANO'] <= 2026)]
+            chave, titulo_local = (sel_uf, sel_mun), f"Município: {sel_mun} / {sel_uf}"
+
+    df_comp = cubo['cubo'].loc[[chave]].reset_index(drop=True) if chave in cubo['cubo'].index else pd.DataFrame(columns=['ANO', 'METAS', 'OBITOS_PRF'])
 
     if df_comp.empty or (df_comp['METAS'].sum() == 0 and df_comp['OBITOS_PRF'].sum() == 0):
         st.info(f"Sem dados suficientes para exibir a correlação em {titulo_local}.")
@@ -140,7 +178,7 @@ def render_comparativo(df_prod_raw, df_prf_raw, tema):
     fig.update_yaxes(title_text="Quantidade de Produtos", secondary_y=False, showgrid=False)
     fig.update_yaxes(title_text="Total de Óbitos (Vítimas Fatais)", secondary_y=True, showgrid=True)
 
-    st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
+    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
 
     with st.expander("📊 Tabela Detalhada do Cruzamento"):
         st.dataframe(df_comp.set_index('ANO'), use_container_width=True)
\ No newline at end of file
@@ -1,12 +1,326 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from utils import html_card, padronizar_grafico, converter_csv
+import numpy as np
+import re
+from utils import (html_card, padronizar_grafico, versao_dados_prf, carregar_opcoes_prf, carregar_brs_prf, exibir_falha,
+                   normalizar_filtros_prf, renderizar_abas, histograma, carregar_denominadores, carregar_grade_mapa,
+                   MAX_CONSULTAS_PRF)
+from graficos import exibir_grafico
+from banco import ErroBanco
+from motor_analitico import agregar
+from agregados import calcular_agregados, mascara_valores
+from cache_orcado import cache_orcado
+from populacao import denominador, disponivel, taxa
 
-def render_prf(df, tema):
+# A página recorta a base PRF compartilhada (versao_dados_prf); nada é pré-carregado
+DADOS_PRF = {}
+
+# --- AGREGADOS DA PÁGINA (CALCULADOS NUMA PASSADA, CACHE POR FILTRO) ---
+ESTADOS_FATAIS = ['ÓBITO', 'MORTO', 'FATAL']
+MARCAS_INVALIDAS = ['NÃO INFORMADO', 'OUTRA', 'NI', 'NI/NI', 'S/M']
+TIPOS_FROTA = ['MOTOCICLETA', 'AUTOMÓVEL', 'CAMINHÃO', 'CAMINHONETE', 'ÔNIBUS', 'MOTONETA']
+# Aba de letalidade -> padrão do TIPO_VEICULO
+CATEGORIAS_LETALIDADE = {
+    'motos': 'MOTOCICLETA', 'motonetas': 'MOTONETA|CICLOMOTOR', 'carros': 'AUTOM|CARRO|CAMIONETA',
+    'pesados': 'CAMINH|TRATOR', 'onibus': 'ONIBUS|MICRO',
+}
+
+def contagem(coluna, top=None, **item):
+    return {'chaves': [coluna], 'medidas': {'count': (coluna, 'size')}, 'top': top, **item}
+
+def tipo_frota(valor):
+    valor = valor.upper()
+    return valor if any(t in valor for t in TIPOS_FROTA) else 'OUTROS'
+
+CONDICOES_PRF = {
+    'fatal': lambda df, f: (df['MORTOS'] > 0).to_numpy() | mascara_valores(df, f, 'ESTADO_FISICO', lambda v: v.upper() in ESTADOS_FATAIS),
+    'marca_valida': lambda df, f: mascara_valores(df, f, 'MARCA', lambda v: v.upper() not in MARCAS_INVALIDAS),
+    'com_ibge': lambda df, f: (df['COD_IBGE'] > 0).to_numpy(),
+    'idade_valida': lambda df, f: ((df['IDADE'] > 0) & (df['IDADE'] < 110)).to_numpy(),
+    'fabricacao_valida': lambda df, f: ((df['ANO_FABRICACAO_VEICULO'] > 1980) & (df['ANO_FABRICACAO_VEICULO'] <= 2026)).to_numpy(),
+    **{f'com_celula_n{n}': (lambda df, f, c=f'CELULA_N{n}': (df[c] > 0).to_numpy()) for n in range(1, 5)},
+}
+DERIVADAS_PRF = {'TIPO_V': ('TIPO_VEICULO', tipo_frota)}
+
+AGREGADOS_PRF = {
+    'kpis': {'medidas': {'pessoas': ('ID', 'size'), 'sinistros': ('ID', 'nunique'), 'mortos': ('MORTOS', 'sum'), 'feridos': ('FERIDOS', 'sum')}},
+    'sexo': contagem('SEXO', se={'SEXO': lambda v: v not in ['NÃO INFORMADO', 'Igno', 'Inválido']}),
+    'estado_fisico': contagem('ESTADO_FISICO', se={'ESTADO_FISICO': lambda v: v not in ['NÃO INFORMADO', 'Igno']}),
+    'tipo_veiculo': contagem('TIPO_VEICULO', top=10),
+    # Contagem por valor: os histogramas são montados sobre ela (ver utils.histograma)
+    'idade': contagem('IDADE', onde=['idade_valida']),
+    'ano_fabricacao': contagem('ANO_FABRICACAO_VEICULO', onde=['fabricacao_valida']),
+    'frota_uf': {'chaves': ['UF', 'TIPO_V'], 'medidas': {'Qtd': ('UF', 'size')}},
+    'uf': contagem('UF'),
+    'municipios': {'chaves': ['MUNICIPIO', 'UF'], 'medidas': {'Qtd': ('ID', 'size')}},
+    'municipios_ibge': {'chaves': ['COD_IBGE', 'MUNICIPIO', 'UF'], 'medidas': {'Qtd': ('ID', 'size')}, 'onde': ['com_ibge']},
+    'causa': contagem('CAUSA_PRINCIPAL', top=10),
+    'condicao': contagem('CONDICAO_METEREOLOGICA'),
+    'fase_dia': contagem('FASE_DIA'),
+    'pista': contagem('TIPO_PISTA'),
+    **{f'letalidade_{nome}': contagem('MARCA', top=15, onde=['fatal', 'marca_valida'],
+                                      se={'TIPO_VEICULO': lambda v, p=padrao: re.search(p, v.upper()) is not None})
+       for nome, padrao in CATEGORIAS_LETALIDADE.items()},
+    **{f'mapa_n{n}': {'chaves': [f'CELULA_N{n}'], 'onde': [f'com_celula_n{n}'],
+                      'medidas': {'ACIDENTES': ('ID', 'nunique'), 'LAT_C': ('LAT', 'mean'), 'LON_C': ('LON', 'mean'), 'MORTOS': ('MORTOS', 'sum')}}
+       for n in range(1, 5)},
+}
+
+@cache_orcado('acidentes_prf (agregados)', max_entries=MAX_CONSULTAS_PRF)
+def agregados_prf(versao, filtros, nomes, _df):
+    """Pacote de agregados da seleção; a chave é a versão da base + filtros normalizados."""
+    return calcular_agregados(_df, {n: AGREGADOS_PRF[n] for n in nomes}, CONDICOES_PRF, DERIVADAS_PRF)
+
+# --- ABAS ---
+def aba_perfil(df_f, ag, tema, filtros, tipo_metrica, versao):
+    c1, c2 = st.columns(2)
+    with c1:
+        st.subheader("Gênero")
+        if 'SEXO' in df_f.columns:
+            df_s = ag['sexo']
+            if not df_s.empty:
+                fig = px.pie(df_s, values='count', names='SEXO', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
+                exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+    with c2:
+        st.subheader("Estado Físico")
+        if 'ESTADO_FISICO' in df_f.columns:
+            df_e = ag['estado_fisico']
+            if not df_e.empty:
+                fig = px.bar(df_e, x='count', y='ESTADO_FISICO', orientation='h', text_auto=True, color='count', color_continuous_scale='Reds')
+                fig.update_layout(yaxis=dict(autorange="reversed"))
+                exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+    st.subheader("Distribuição Etária")
+    if 'IDADE' in df_f.columns:
+        df_i = ag['idade']
+        if not df_i.empty:
+            fig = histograma(df_i['IDADE'], nbins=50, pesos=df_i['count'], rotulo_x="IDADE", cor='#2196F3')
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+def aba_veiculos(df_f, ag, tema, filtros, tipo_metrica, versao):
+    c_veic, c_ano = st.columns(2)
+    with c_veic:
+        st.subheader("Participação por Tipo de Veículo")
+        if 'TIPO_VEICULO' in df_f.columns:
+            top_v = ag['tipo_veiculo']
+            fig = px.bar(top_v, x='count', y='TIPO_VEICULO', orientation='h', text_auto=True, color='count')
+            fig.update_layout(yaxis=dict(autorange="reversed"))
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+    with c_ano:
+        st.subheader("Idade da Frota")
+        if 'ANO_FABRICACAO_VEICULO' in df_f.columns:
+            df_ano = ag['ano_fabricacao']
+            fig = histograma(df_ano['ANO_FABRICACAO_VEICULO'], nbins=20, pesos=df_ano['count'], rotulo_x="ANO_FABRICACAO_VEICULO")
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+    st.divider()
+    st.markdown("### ☠️ Ranking de Letalidade (Óbitos por Categoria)")
+    t_moto, t_motoneta, t_carro, t_pesado, t_bus = st.tabs(["🏍️ Motos", "🛵 Motonetas", "🚗 Carros", "🚛 Pesados", "🚌 Ônibus"])
+
+    if 'MARCA' in df_f.columns and 'TIPO_VEICULO' in df_f.columns:
+        # Vítimas fatais com marca informada, por categoria de veículo (ver CATEGORIAS_LETALIDADE)
+        def plot_ranking(categoria, cor):
+            ranking = ag[f'letalidade_{categoria}']
+            if ranking.empty: 
+                st.info("Sem dados suficientes.")
+                return
+            fig = px.bar(ranking, x='count', y='MARCA', orientation='h', text_auto=True, color='count', color_continuous_scale=cor)
+            fig.update_layout(yaxis=dict(autorange="reversed"))
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+        with t_moto: plot_ranking('motos', 'Reds')
+        with t_motoneta: plot_ranking('motonetas', 'Purples')
+        with t_carro: plot_ranking('carros', 'Blues')
+        with t_pesado: plot_ranking('pesados', 'Oranges')
+        with t_bus: plot_ranking('onibus', 'Greens')
+
+def aba_localizacao(df_f, ag, tema, filtros, tipo_metrica, versao):
+    # --- LÓGICA DE CORES ---
+    # Se for Absoluto -> AZUL
+    # Se for Taxa -> VERMELHO
+    if tipo_metrica == "Absoluto":
+        cor_ranking = 'Blues'
+    else:
+        cor_ranking = 'Reds'
+
+    # Denominadores de população (ano mais recente selecionado, quando a tabela traz anos)
+    pop = None
+    if tipo_metrica == "Taxa por 1.000 hab":
+        try: pop = carregar_denominadores()
+        except ErroBanco as e: exibir_falha(e)
+        if pop is None or not disponivel(pop):
+            st.warning("⚠️ Dados de população não disponíveis. Mostrando Absoluto.")
+            tipo_metrica = "Absoluto"
+            cor_ranking = 'Blues' # Fallback para azul
+    ano_pop = max(filtros[0]) if filtros[0] else None
+
+    # 1. Gráfico Empilhado (Estados x Veículos)
+    st.markdown("##### 🚗 Composição da Frota Acidentada por UF")
+    if 'TIPO_VEICULO' in df_f.columns:
+        top_ufs = ag['uf']['UF'].head(15)
+        df_g = ag['frota_uf'][ag['frota_uf']['UF'].isin(top_ufs)]
+        fig_s = px.bar(df_g, x='Qtd', y='UF', color='TIPO_V', orientation='h', barmode='stack')
+        fig_s.update_layout(yaxis=dict(autorange="reversed"))
+        exibir_grafico(padronizar_grafico(fig_s, tema), use_container_width=True)
+
+    st.divider()
+
+    # --- RANKING DE ESTADOS (COR CONDICIONAL) ---
+    st.markdown(f"### 🗺️ Ranking por Estado ({tipo_metrica})")
+    df_uf = ag['uf'].rename(columns={'count': 'Qtd'})
+
+    if tipo_metrica == "Taxa por 1.000 hab":
+        df_m = df_uf.assign(populacao=denominador(pop, 'uf', df_uf['UF'], ano_pop)).dropna(subset=['populacao'])
+        df_m['Valor'] = taxa(df_m['Qtd'], df_m['populacao'], por=1000)
+
+        # TAXA = VERMELHO ('Reds')
+        fig = px.bar(df_m.sort_values('Valor', ascending=False).head(30), x='Valor', y='UF', orientation='h', 
+                     text_auto='.2f', color='Valor', color_continuous_scale=cor_ranking, height=700)
+    else:
+        # ABSOLUTO = AZUL ('Blues')
+        fig = px.bar(df_uf.head(30), x='Qtd', y='UF', orientation='h', 
+                     text_auto=True, color='Qtd', color_continuous_scale=cor_ranking, height=700)
+
+    fig.update_layout(yaxis=dict(autorange="reversed"))
+    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+    st.divider()
+
+    # --- RANKING DE MUNICÍPIOS (COR CONDICIONAL) ---
+    st.markdown(f"### 🏙️ Ranking de Municípios ({tipo_metrica})")
+    df_m_c = ag['municipios'].copy()
+
+    if tipo_metrica == "Taxa por 1.000 hab":
+        if 'COD_IBGE' in df_f.columns and disponivel(pop, 'municipio'):
+            # Cruzamento por código IBGE (inteiro), sem depender da grafia dos nomes
+            df_m2 = ag['municipios_ibge'].assign(populacao=lambda d: denominador(pop, 'municipio', d['COD_IBGE'], ano_pop))
+        else:
+            df_m2 = df_m_c.assign(populacao=denominador(pop, 'municipio_nome', (df_m_c['MUNICIPIO'], df_m_c['UF']), ano_pop))
+        df_m2 = df_m2[df_m2['populacao'] > 5000] # Filtra cidades muito pequenas (e sem população)
+        df_m2['Valor'] = taxa(df_m2['Qtd'], df_m2['populacao'], por=1000)
+        df_m2['Label'] = df_m2['MUNICIPIO'].astype(str) + "-" + df_m2['UF'].astype(str)
+
+        # TAXA = VERMELHO ('Reds')
+        fig = px.bar(df_m2.sort_values('Valor', ascending=False).head(30), x='Valor', y='Label', orientation='h', 
+                     text_auto='.2f', color='Valor', color_continuous_scale=cor_ranking, height=800)
+    else:
+        df_m_c['Label'] = df_m_c['MUNICIPIO'].astype(str) + "-" + df_m_c['UF'].astype(str)
+        # ABSOLUTO = AZUL ('Blues')
+        fig = px.bar(df_m_c.sort_values('Qtd', ascending=False).head(30), x='Qtd', y='Label', orientation='h', 
+                     text_auto=True, color='Qtd', color_continuous_scale=cor_ranking, height=800)
+
+    fig.update_layout(yaxis=dict(autorange="reversed"))
+    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+def aba_causas(df_f, ag, tema, filtros, tipo_metrica, versao):
+    c1, c2 = st.columns(2)
+    with c1:
+        st.subheader("Causa Principal")
+        if 'CAUSA_PRINCIPAL' in df_f.columns:
+            top_c = ag['causa']
+            fig = px.bar(top_c, x='count', y='CAUSA_PRINCIPAL', orientation='h', text_auto=True, color='count')
+            fig.update_layout(yaxis=dict(autorange="reversed"))
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+    with c2:
+        st.subheader("Condição Meteorológica")
+        if 'CONDICAO_METEREOLOGICA' in df_f.columns:
+            fig = px.pie(ag['condicao'], values='count', names='CONDICAO_METEREOLOGICA', hole=0.5)
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+    c_f, c_p = st.columns(2)
+    with c_f:
+        st.subheader("Fase do Dia")
+        if 'FASE_DIA' in df_f.columns:
+            fig = px.pie(ag['fase_dia'], values='count', names='FASE_DIA', hole=0.5)
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+    with c_p:
+        st.subheader("Tipo de Pista")
+        if 'TIPO_PISTA' in df_f.columns:
+            fig = px.bar(ag['pista'], x='count', y='TIPO_PISTA', orientation='h', text_auto=True)
+            fig.update_layout(yaxis=dict(autorange="reversed"))
+            exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+
+def grade_selecao(df_f, filtros, nivel, versao):
+    """Células da seleção num nível da grade do ETL (LAT_C, LON_C, ACIDENTES, MORTOS), cobrindo 100% dos registros."""
+    sel_anos, sel_ufs, sel_brs, sel_fisico = filtros
+    df_grade = pd.DataFrame()
+    if not sel_brs and not sel_fisico:
+        # Filtros de ANO/UF: lê direto os agregados exatos do ETL
+        try: df_grade = carregar_grade_mapa()
+        except ErroBanco as e: exibir_falha(e)
+        if not df_grade.empty:
+            df_grade = df_grade[df_grade['NIVEL'] == nivel]
+            if sel_anos: df_grade = df_grade[df_grade['ANO'].isin(sel_anos)]
+            if sel_ufs: df_grade = df_grade[df_grade['UF'].isin(sel_ufs)]
+            df_grade = agregar(df_grade, ['CELULA', 'LAT_C', 'LON_C'], ACIDENTES=('ACIDENTES', 'sum'), MORTOS=('MORTOS', 'sum'))
+
+    if df_grade.empty and f'CELULA_N{nivel}' in df_f.columns and 'LAT' in df_f.columns:
+        # Filtros de BR/Estado Físico: agrega a seleção pela célula carimbada no ETL
+        df_grade = agregados_prf(versao, filtros, (f'mapa_n{nivel}',), df_f)[f'mapa_n{nivel}']
+    return df_grade
+
+def aba_mapa(df_f, ag, tema, filtros, tipo_metrica, versao):
+    st.subheader("Mapa de Calor (Densidade de Ocorrências)")
+    c_det, c_peso = st.columns([2, 1])
+    with c_det:
+        detalhe = st.select_slider("🔍 Detalhe do mapa:", list(DETALHES_MAPA), value='Estado' if filtros[1] else 'Região', key='mapa_detalhe')
+    with c_peso:
+        peso = st.radio("⚖️ Peso:", list(PESOS_MAPA), horizontal=True, key='mapa_peso')
+    nivel, zoom, raio = DETALHES_MAPA[detalhe]
+    col_peso = PESOS_MAPA[peso]
+
+    # Agregação no servidor: o navegador recebe só centro e peso de cada célula
+    df_grade = grade_selecao(df_f, filtros, nivel, versao)
+    while len(df_grade) > MAX_CELULAS_MAPA and nivel > 1:
+        nivel -= 1
+        df_grade = grade_selecao(df_f, filtros, nivel, versao)
+
+    if not df_grade.empty:
+        df_plot = df_grade.loc[df_grade[col_peso] > 0, ['LAT_C', 'LON_C', col_peso]].round({'LAT_C': 3, 'LON_C': 3})
+        aviso = "" if nivel == DETALHES_MAPA[detalhe][0] else f" Detalhe reduzido para o nível {nivel} (limite de {MAX_CELULAS_MAPA:,} células)."
+        st.caption(f"{int(df_grade['ACIDENTES'].sum()):,} sinistros georreferenciados em {len(df_plot):,} células de {TAMANHO_CELULA[nivel]} (100% da seleção).{aviso}")
+        if df_plot.empty:
+            st.info(f"Nenhum registro com {peso.lower()} na seleção.")
+            return
+        centro = dict(lat=np.average(df_plot['LAT_C'], weights=df_plot[col_peso]), lon=np.average(df_plot['LON_C'], weights=df_plot[col_peso]))
+
+        # Mapa estilo Open Street Map com Zoom habilitado
+        fig_map = px.density_mapbox(
+            df_plot, lat='LAT_C', lon='LON_C', z=col_peso, radius=raio, zoom=zoom,
+            center=centro,
+            mapbox_style="open-street-map"
+        )
+        fig_map.update_layout(height=600, margin={"r":0,"t":0,"l":0,"b":0})
+        exibir_grafico(fig_map, use_container_width=True, config={'scrollZoom': True})
+    else: 
+        st.warning("Sem coordenadas válidas registradas.")
+
+# Detalhe -> (nível da grade do ETL, zoom inicial, raio em px); níveis em scripts/etl_process.py (NIVEIS_GRADE)
+DETALHES_MAPA = {'Brasil': (1, 3, 25), 'Região': (2, 4, 15), 'Estado': (3, 5, 10), 'Cidade': (4, 7, 6)}
+TAMANHO_CELULA = {1: '1° (~110 km)', 2: '0,25° (~28 km)', 3: '0,05° (~5 km)', 4: '0,01° (~1 km)'}
+PESOS_MAPA = {'Sinistros': 'ACIDENTES', 'Óbitos': 'MORTOS'}
+# Acima disso o mapa usa o nível mais grosso seguinte (payload na casa das dezenas de KB)
+MAX_CELULAS_MAPA = 2000
+
+# Rótulo, função e agregados de cada aba
+ABAS_PRF = [
+    ("👥 Perfil Vítimas", aba_perfil, ('sexo', 'estado_fisico', 'idade')),
+    ("🚗 Veículos & Frota", aba_veiculos, ('tipo_veiculo', 'ano_fabricacao') + tuple(f'letalidade_{c}' for c in CATEGORIAS_LETALIDADE)),
+    ("📍 Localização & Taxas", aba_localizacao, ('uf', 'frota_uf', 'municipios', 'municipios_ibge')),
+    ("⚠️ Causas & Contexto", aba_causas, ('causa', 'condicao', 'fase_dia', 'pista')),
+    ("🗺️ Mapa Geo", aba_mapa, ()),
+]
+
+def render_prf(tema):
     st.markdown("### 🚗 PRF - Monitoramento Avançado de Sinistros")
     
-    if df.empty: 
+    # Opções dos filtros vêm de SELECT DISTINCT; a base é carregada já filtrada pelo banco
+    try: opcoes = carregar_opcoes_prf()
+    except ErroBanco as e:
+        exibir_falha(e)
+        return
+    if not opcoes['ANO']: 
         st.error("⚠️ Base de dados vazia. Verifique a conexão.")
         return
 
@@ -15,7 +329,7 @@ def render_prf(df, tema):
     st.sidebar.subheader("Filtros")
     
     # 1. Ano
-    anos = sorted(df['ANO'].unique(), reverse=True)
+    anos = sorted(opcoes['ANO'], reverse=True)
     sel_anos = st.sidebar.multiselect("📅 Ano:", anos, default=[anos[0]] if anos else [])
     
     # 2. Métrica de Visualização (SELETOR DE CORES/TIPO)
@@ -23,39 +337,39 @@ def render_prf(df, tema):
     tipo_metrica = st.sidebar.radio("📊 Métrica dos Rankings:", ["Absoluto", "Taxa por 1.000 hab"])
 
     # 3. Estado Físico
-    if 'ESTADO_FISICO' in df.columns:
-        lista_fisico = [str(x) for x in df['ESTADO_FISICO'].unique() if pd.notna(x) and str(x).lower() != 'nan']
-        opcoes_fisico = sorted(lista_fisico)
-        sel_fisico = st.sidebar.multiselect("🏥 Estado Físico (Vítima):", opcoes_fisico, placeholder="Todos (Padrão)")
-    else:
-        sel_fisico = []
+    lista_fisico = [str(x) for x in opcoes['ESTADO_FISICO'] if pd.notna(x) and str(x).lower() != 'nan']
+    opcoes_fisico = sorted(lista_fisico)
+    sel_fisico = st.sidebar.multiselect("🏥 Estado Físico (Vítima):", opcoes_fisico, placeholder="Todos (Padrão)")
 
     # 4. Estado (UF)
-    ufs_list = sorted(df['UF'].astype(str).unique())
+    ufs_list = sorted(str(u) for u in opcoes['UF'])
     sel_ufs = st.sidebar.multiselect("🗺️ Estado (UF):", ufs_list, placeholder="Todos (Brasil)")
 
-    # Filtragem preliminar
-    df_temp = df
-    if sel_anos: df_temp = df_temp[df_temp['ANO'].isin(sel_anos)]
-    if sel_ufs: df_temp = df_temp[df_temp['UF'].isin(sel_ufs)]
-    
-    # 5. Rodovia
-    brs_disponiveis = sorted(df_temp['BR'].astype(str).unique())
-    sel_brs = st.sidebar.multiselect("🛣️ Rodovia (BR):", brs_disponiveis[:200])
+    # 5. Rodovia (opções dependem de Ano/UF)
+    try:
+        brs_disponiveis = carregar_brs_prf(sel_anos, sel_ufs)
+        sel_brs = st.sidebar.multiselect("🛣️ Rodovia (BR):", brs_disponiveis[:200])
+
+        # --- APLICAÇÃO FINAL DOS FILTROS (WHERE no banco) ---
+        # A versão vem com os dados: durante uma atualização ambos são os da versão anterior, a servida
+        v, df_f = versao_dados_prf(sel_anos, sel_ufs, sel_brs, sel_fisico)
+    except ErroBanco as e:
+        exibir_falha(e)
+        return
+    if df_f.empty:
+        st.warning("⚠️ Nenhum registro encontrado para os filtros selecionados.")
+        return
 
-    # --- APLICAÇÃO FINAL DOS FILTROS ---
-    df_f = df.copy()
-    if sel_anos: df_f = df_f[df_f['ANO'].isin(sel_anos)]
-    if sel_ufs: df_f = df_f[df_f['UF'].isin(sel_ufs)]
-    if sel_brs: df_f = df_f[df_f['BR'].astype(str).isin(sel_brs)]
-    if sel_fisico: df_f = df_f[df_f['ESTADO_FISICO'].astype(str).isin(sel_fisico)]
+    # Agregados numa passada por aba, em cache pela versão da base + filtros normalizados
+    filtros = normalizar_filtros_prf(sel_anos, sel_ufs, sel_brs, sel_fisico)
 
     # --- KPIs GERAIS ---
     k1, k2, k3, k4 = st.columns(4)
-    total_pessoas = len(df_f) 
-    total_sinistros = df_f['ID'].nunique() if 'ID' in df_f.columns else len(df_f)
-    mortos = int(df_f['MORTOS'].sum())
-    feridos = int(df_f['FERIDOS'].sum())
+    kpis = agregados_prf(v, filtros, ('kpis',), df_f)['kpis'].iloc[0]
+    total_pessoas = int(kpis['pessoas'])
+    total_sinistros = int(kpis['sinistros'])
+    mortos = int(kpis['mortos'])
+    feridos = int(kpis['feridos'])
     sev = (mortos / total_sinistros * 100) if total_sinistros > 0 else 0
     
     with k1: st.markdown(html_card("Sinistros", f"{total_sinistros:,}", "Ocorrências Únicas", tema), unsafe_allow_html=True)
@@ -64,202 +378,8 @@ def render_prf(df, tema):
     with k4: st.markdown(html_card("Índice Severidade", f"{sev:.1f}", "Mortos / 100 Sinistros", tema), unsafe_allow_html=True)
 
     st.divider()
-    
-    # --- ÁREA DE ANÁLISE ---
-    tabs = st.tabs(["👥 Perfil Vítimas", "🚗 Veículos & Frota", "📍 Localização & Taxas", "⚠️ Causas & Contexto", "🗺️ Mapa Geo"])
-    
-    # ABA 1: PERFIL VÍTIMAS
-    with tabs[0]:
-        c1, c2 = st.columns(2)
-        with c1:
-            st.subheader("Gênero")
-            if 'SEXO' in df_f.columns:
-                df_s = df_f[~df_f['SEXO'].isin(['NÃO INFORMADO', 'Igno', 'Inválido'])]
-                if not df_s.empty:
-                    fig = px.pie(df_s['SEXO'].value_counts().reset_index(), values='count', names='SEXO', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
-                    st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        with c2:
-            st.subheader("Estado Físico")
-            if 'ESTADO_FISICO' in df_f.columns:
-                df_e = df_f[~df_f['ESTADO_FISICO'].isin(['NÃO INFORMADO', 'Igno'])]
-                if not df_e.empty:
-                    fig = px.bar(df_e['ESTADO_FISICO'].value_counts().reset_index(), x='count', y='ESTADO_FISICO', orientation='h', text_auto=True, color='count', color_continuous_scale='Reds')
-                    fig.update_layout(yaxis=dict(autorange="reversed"))
-                    st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        
-        st.subheader("Distribuição Etária")
-        if 'IDADE' in df_f.columns:
-            df_i = df_f[(df_f['IDADE'] > 0) & (df_f['IDADE'] < 110)]
-            if not df_i.empty:
-                fig = px.histogram(df_i, x="IDADE", nbins=50, color_discrete_sequence=['#2196F3'], text_auto=True)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-
-    # ABA 2: VEÍCULOS & FROTA
-    with tabs[1]:
-        c_veic, c_ano = st.columns(2)
-        with c_veic:
-            st.subheader("Participação por Tipo de Veículo")
-            if 'TIPO_VEICULO' in df_f.columns:
-                top_v = df_f['TIPO_VEICULO'].value_counts().head(10).reset_index()
-                fig = px.bar(top_v, x='count', y='TIPO_VEICULO', orientation='h', text_auto=True, color='count')
-                fig.update_layout(yaxis=dict(autorange="reversed"))
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        with c_ano:
-            st.subheader("Idade da Frota")
-            if 'ANO_FABRICACAO_VEICULO' in df_f.columns:
-                df_ano = df_f[(df_f['ANO_FABRICACAO_VEICULO'] > 1980) & (df_f['ANO_FABRICACAO_VEICULO'] <= 2026)]
-                fig = px.histogram(df_ano, x="ANO_FABRICACAO_VEICULO", nbins=20, text_auto=True)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        
-        st.divider()
-        st.markdown("### ☠️ Ranking de Letalidade (Óbitos por Categoria)")
-        t_moto, t_motoneta, t_carro, t_pesado, t_bus = st.tabs(["🏍️ Motos", "🛵 Motonetas", "🚗 Carros", "🚛 Pesados", "🚌 Ônibus"])
-
-        if 'MARCA' in df_f.columns and 'TIPO_VEICULO' in df_f.columns:
-            df_fatal = df_f[(df_f['MORTOS'] > 0) | (df_f['ESTADO_FISICO'].astype(str).str.upper().isin(['ÓBITO', 'MORTO', 'FATAL']))].copy()
-            df_fatal = df_fatal[~df_fatal['MARCA'].astype(str).str.upper().isin(['NÃO INFORMADO', 'OUTRA', 'NI', 'NI/NI', 'S/M'])]
-
-            def plot_ranking(df_source, regex, cor):
-                mask = df_source['TIPO_VEICULO'].astype(str).str.upper().str.contains(regex)
-                ranking = df_source[mask]['MARCA'].value_counts().head(15).reset_index()
-                if ranking.empty: 
-                    st.info("Sem dados suficientes.")
-                    return
-                fig = px.bar(ranking, x='count', y='MARCA', orientation='h', text_auto=True, color='count', color_continuous_scale=cor)
-                fig.update_layout(yaxis=dict(autorange="reversed"))
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-
-            with t_moto: plot_ranking(df_fatal, 'MOTOCICLETA', 'Reds')
-            with t_motoneta: plot_ranking(df_fatal, 'MOTONETA|CICLOMOTOR', 'Purples')
-            with t_carro: plot_ranking(df_fatal, 'AUTOM|CARRO|CAMIONETA', 'Blues')
-            with t_pesado: plot_ranking(df_fatal, 'CAMINH|TRATOR', 'Oranges')
-            with t_bus: plot_ranking(df_fatal, 'ONIBUS|MICRO', 'Greens')
-
-    # ABA 3: LOCALIZAÇÃO & TAXAS (CORES CORRIGIDAS)
-    with tabs[2]:
-        # --- LÓGICA DE CORES ---
-        # Se for Absoluto -> AZUL
-        # Se for Taxa -> VERMELHO
-        if tipo_metrica == "Absoluto":
-            cor_ranking = 'Blues'
-        else:
-            cor_ranking = 'Reds'
-
-        # Carregamento de População
-        df_pop = pd.DataFrame()
-        if tipo_metrica == "Taxa por 1.000 hab":
-            from utils import carregar_populacao
-            df_pop = carregar_populacao()
-            if df_pop.empty:
-                st.warning("⚠️ Dados de população não disponíveis. Mostrando Absoluto.")
-                tipo_metrica = "Absoluto"
-                cor_ranking = 'Blues' # Fallback para azul
-
-        # 1. Gráfico Empilhado (Estados x Veículos)
-        st.markdown("##### 🚗 Composição da Frota Acidentada por UF")
-        if 'TIPO_VEICULO' in df_f.columns:
-            top_tipos = ['MOTOCICLETA', 'AUTOMÓVEL', 'CAMINHÃO', 'CAMINHONETE', 'ÔNIBUS', 'MOTONETA']
-            df_s = df_f.copy()
-            df_s['TIPO_V'] = df_s['TIPO_VEICULO'].str.upper()
-            df_s.loc[~df_s['TIPO_V'].apply(lambda x: any(t in str(x) for t in top_tipos)), 'TIPO_V'] = 'OUTROS'
-            top_ufs = df_s['UF'].value_counts().head(15).index
-            df_g = df_s[df_s['UF'].isin(top_ufs)].groupby(['UF', 'TIPO_V']).size().reset_index(name='Qtd')
-            fig_s = px.bar(df_g, x='Qtd', y='UF', color='TIPO_V', orientation='h', barmode='stack')
-            fig_s.update_layout(yaxis=dict(autorange="reversed"))
-            st.plotly_chart(padronizar_grafico(fig_s, tema), use_container_width=True)
-
-        st.divider()
-        
-        # --- RANKING DE ESTADOS (COR CONDICIONAL) ---
-        st.markdown(f"### 🗺️ Ranking por Estado ({tipo_metrica})")
-        df_uf = df_f['UF'].value_counts().reset_index(name='Qtd').rename(columns={'index':'UF'})
-        
-        if tipo_metrica == "Taxa por 1.000 hab" and not df_pop.empty:
-            pop_uf = df_pop.groupby('uf_norm')['populacao'].sum().reset_index()
-            df_m = pd.merge(df_uf, pop_uf, left_on='UF', right_on='uf_norm')
-            df_m['Valor'] = (df_m['Qtd'] / df_m['populacao']) * 1000
-            
-            # TAXA = VERMELHO ('Reds')
-            fig = px.bar(df_m.sort_values('Valor', ascending=False).head(30), x='Valor', y='UF', orientation='h', 
-                         text_auto='.2f', color='Valor', color_continuous_scale=cor_ranking, height=700)
-        else:
-            # ABSOLUTO = AZUL ('Blues')
-            fig = px.bar(df_uf.head(30), x='Qtd', y='UF', orientation='h', 
-                         text_auto=True, color='Qtd', color_continuous_scale=cor_ranking, height=700)
-        
-        fig.update_layout(yaxis=dict(autorange="reversed"))
-        st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-
-        st.divider()
-
-        # --- RANKING DE MUNICÍPIOS (COR CONDICIONAL) ---
-        st.markdown(f"### 🏙️ Ranking de Municípios ({tipo_metrica})")
-        df_m_c = df_f.groupby(['MUNICIPIO', 'UF']).size().reset_index(name='Qtd')
-        
-        if tipo_metrica == "Taxa por 1.000 hab" and not df_pop.empty:
-            df_m_c['mun_n'] = df_m_c['MUNICIPIO'].str.upper().str.strip()
-            df_m2 = pd.merge(df_m_c, df_pop, left_on=['mun_n', 'UF'], right_on=['municipio_norm', 'uf_norm'])
-            df_m2 = df_m2[df_m2['populacao'] > 5000] # Filtra cidades muito pequenas
-            df_m2['Valor'] = (df_m2['Qtd'] / df_m2['populacao']) * 1000
-            df_m2['Label'] = df_m2['MUNICIPIO'] + "-" + df_m2['UF']
-            
-            # TAXA = VERMELHO ('Reds')
-            fig = px.bar(df_m2.sort_values('Valor', ascending=False).head(30), x='Valor', y='Label', orientation='h', 
-                         text_auto='.2f', color='Valor', color_continuous_scale=cor_ranking, height=800)
-        else:
-            df_m_c['Label'] = df_m_c['MUNICIPIO'] + "-" + df_m_c['UF']
-            # ABSOLUTO = AZUL ('Blues')
-            fig = px.bar(df_m_c.sort_values('Qtd', ascending=False).head(30), x='Qtd', y='Label', orientation='h', 
-                         text_auto=True, color='Qtd', color_continuous_scale=cor_ranking, height=800)
-        
-        fig.update_layout(yaxis=dict(autorange="reversed"))
-        st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-
-    # ABA 4: CAUSAS
-    with tabs[3]:
-        c1, c2 = st.columns(2)
-        with c1:
-            st.subheader("Causa Principal")
-            if 'CAUSA_PRINCIPAL' in df_f.columns:
-                top_c = df_f['CAUSA_PRINCIPAL'].value_counts().head(10).reset_index()
-                fig = px.bar(top_c, x='count', y='CAUSA_PRINCIPAL', orientation='h', text_auto=True, color='count')
-                fig.update_layout(yaxis=dict(autorange="reversed"))
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        with c2:
-            st.subheader("Condição Meteorológica")
-            if 'CONDICAO_METEREOLOGICA' in df_f.columns:
-                fig = px.pie(df_f['CONDICAO_METEREOLOGICA'].value_counts().reset_index(), values='count', names='CONDICAO_METEREOLOGICA', hole=0.5)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        
-        c_f, c_p = st.columns(2)
-        with c_f:
-            st.subheader("Fase do Dia")
-            if 'FASE_DIA' in df_f.columns:
-                fig = px.pie(df_f['FASE_DIA'].value_counts().reset_index(), values='count', names='FASE_DIA', hole=0.5)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        with c_p:
-            st.subheader("Tipo de Pista")
-            if 'TIPO_PISTA' in df_f.columns:
-                fig = px.bar(df_f['TIPO_PISTA'].value_counts().reset_index(), x='count', y='TIPO_PISTA', orientation='h', text_auto=True)
-                fig.update_layout(yaxis=dict(autorange="reversed"))
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-
-    # ABA 5: MAPA (COM ZOOM E LINHAS)
-    with tabs[4]:
-        st.subheader("Mapa de Calor (Densidade de Ocorrências)")
-        if 'LAT' in df_f.columns and 'LON' in df_f.columns:
-            coords = df_f[(df_f['LAT'] != 0) & (df_f['LON'] != 0)]
-            if not coords.empty:
-                if len(coords) > 20000: coords = coords.sample(20000)
-                st.caption(f"Exibindo amostra de {len(coords):,} pontos georreferenciados.")
-                
-                # Mapa estilo Open Street Map com Zoom habilitado
-                fig_map = px.density_mapbox(
-                    coords, lat='LAT', lon='LON', radius=10, zoom=3, 
-                    center=dict(lat=-15.78, lon=-47.92),
-                    mapbox_style="open-street-map"
-                )
-                fig_map.update_layout(height=600, margin={"r":0,"t":0,"l":0,"b":0})
-                st.plotly_chart(fig_map, use_container_width=True, config={'scrollZoom': True})
-            else: 
-                st.warning("Sem coordenadas válidas registradas.")
\ No newline at end of file
+
+    # --- ÁREA DE ANÁLISE (só a aba aberta calcula seus agregados e gráficos) ---
+    def aba(funcao, itens):
+        return lambda: funcao(df_f, agregados_prf(v, filtros, itens, df_f), tema, filtros, tipo_metrica, v)
+    renderizar_abas('prf', [(rotulo, aba(funcao, itens)) for rotulo, funcao, itens in ABAS_PRF])
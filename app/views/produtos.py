@@ -1,7 +1,14 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from utils import html_card, padronizar_grafico, converter_csv, carregar_geojson, carregar_capacitacoes
+from utils import html_card, padronizar_grafico, converter_csv, carregar_capacitacoes, exibir_falha, renderizar_abas
+from graficos import exibir_grafico
+from geometrias import carregar_geometria
+from banco import ErroBanco
+
+# Datasets (e colunas) consumidos por cada página deste módulo
+DADOS_VISAO_GERAL = {'mapa': None, 'org': None, 'prod': None, 'status': None, 'users': None, 'mun': None}
+DADOS_ANALISE_TEMPORAL = {'mensal': None}
 
 def render_visao_geral(df_mapa, df_org, df_prod, df_status, tema, df_mun, df_users=pd.DataFrame()):
     st.markdown(f"### 📊 Visão Geral Completa")
@@ -72,220 +79,223 @@ def render_visao_geral(df_mapa, df_org, df_prod, df_status, tema, df_mun, df_use
 
     st.divider()
     
+    # --- SEÇÕES (só a seção aberta é calculada; a de capacitações consulta o banco) ---
     # --- 3. Mapa e Status ---
-    c_mapa, c_status = st.columns([3, 2])
-    with c_mapa:
-        st.subheader("🗺️ Mapa de Entregas")
-        try:
-            if not df_mapa.empty:
-                geo = carregar_geojson()
-                fig = px.choropleth(df_mapa, geojson=geo, locations='UF', featureidkey="properties.sigla",
-                                    color='Total', color_continuous_scale='Reds', scope="south america")
-                fig.update_geos(fitbounds="locations", visible=False, bgcolor="rgba(0,0,0,0)")
-                fig.update_layout(height=500, margin={"r":0,"t":0,"l":0,"b":0}, dragmode=False)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True, config={'scrollZoom': False, 'displayModeBar': False})
-            else: st.info("Sem dados para o mapa.")
-        except: st.warning("Carregando mapa...")
-
-    with c_status:
-        st.subheader("🚦 Status por UF")
-        if not df_status.empty:
-            fig = px.bar(df_status, x="Quantidade", y="UF_LIMPA", color="STATUS_LIMPO", orientation='h')
-            fig.update_layout(yaxis={'categoryorder':'total ascending', 'title': None}, xaxis={'title': None})
-            st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        else: st.info("Sem dados de status.")
+    def secao_mapa():
+        c_mapa, c_status = st.columns([3, 2])
+        with c_mapa:
+            st.subheader("🗺️ Mapa de Entregas")
+            try:
+                if not df_mapa.empty:
+                    # Malha local simplificada para ~500px de altura, só com as UFs do mapa
+                    geo = carregar_geometria('ufs', tamanho_px=500, chave='sigla', valores=df_mapa['UF'])
+                    fig = px.choropleth(df_mapa, geojson=geo, locations='UF', featureidkey="properties.sigla",
+                                        color='Total', color_continuous_scale='Reds', scope="south america")
+                    fig.update_geos(fitbounds="locations", visible=False, bgcolor="rgba(0,0,0,0)")
+                    fig.update_layout(height=500, margin={"r":0,"t":0,"l":0,"b":0}, dragmode=False)
+                    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True, config={'scrollZoom': False, 'displayModeBar': False})
+                else: st.info("Sem dados para o mapa.")
+            except: st.warning("Carregando mapa...")
 
-    st.divider()
+        with c_status:
+            st.subheader("🚦 Status por UF")
+            if not df_status.empty:
+                fig = px.bar(df_status, x="Quantidade", y="UF_LIMPA", color="STATUS_LIMPO", orientation='h')
+                fig.update_layout(yaxis={'categoryorder':'total ascending', 'title': None}, xaxis={'title': None})
+                exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+            else: st.info("Sem dados de status.")
 
     # --- 4. Produtos e Municípios ---
-    col_prod, col_mun = st.columns(2)
-    with col_prod:
-        st.subheader("📦 Top Produtos")
-        if not df_prod.empty:
-            top_p = df_prod.head(10).sort_values('Quantidade', ascending=True)
-            col_y = 'COD_PRODUTO' if 'COD_PRODUTO' in top_p.columns else top_p.columns[0]
-            fig_p = px.bar(top_p, x='Quantidade', y=col_y, orientation='h', text_auto=True)
-            fig_p.update_layout(yaxis_title=None, xaxis_title=None)
-            st.plotly_chart(padronizar_grafico(fig_p, tema), use_container_width=True)
-        else: st.info("Sem dados.")
+    def secao_produtos():
+        col_prod, col_mun = st.columns(2)
+        with col_prod:
+            st.subheader("📦 Top Produtos")
+            if not df_prod.empty:
+                top_p = df_prod.head(10).sort_values('Quantidade', ascending=True)
+                col_y = 'COD_PRODUTO' if 'COD_PRODUTO' in top_p.columns else top_p.columns[0]
+                fig_p = px.bar(top_p, x='Quantidade', y=col_y, orientation='h', text_auto=True)
+                fig_p.update_layout(yaxis_title=None, xaxis_title=None)
+                exibir_grafico(padronizar_grafico(fig_p, tema), use_container_width=True)
+            else: st.info("Sem dados.")
 
-    with col_mun:
-        st.subheader("🏙️ Top Municípios")
-        if not df_mun.empty:
-            top_m = df_mun.head(10).sort_values('Quantidade', ascending=True)
-            fig_m = px.bar(top_m, x='Quantidade', y='Municipio', orientation='h', text_auto=True, color_discrete_sequence=['#00CC96'])
-            fig_m.update_layout(yaxis_title=None, xaxis_title=None)
-            st.plotly_chart(padronizar_grafico(fig_m, tema), use_container_width=True)
-        else: st.info("Sem dados.")
+        with col_mun:
+            st.subheader("🏙️ Top Municípios")
+            if not df_mun.empty:
+                top_m = df_mun.head(10).sort_values('Quantidade', ascending=True)
+                fig_m = px.bar(top_m, x='Quantidade', y='Municipio', orientation='h', text_auto=True, color_discrete_sequence=['#00CC96'])
+                fig_m.update_layout(yaxis_title=None, xaxis_title=None)
+                exibir_grafico(padronizar_grafico(fig_m, tema), use_container_width=True)
+            else: st.info("Sem dados.")
 
-    st.divider()
-    
     # --- 5. ESFERAS E TABELA ---
-    c_esf, c_tab = st.columns([1, 2])
-    with c_esf:
-        st.subheader("🏛️ Por Esfera")
-        if not df_ativos.empty:
-            df_esf = df_ativos['ESFERA_LIMPA'].value_counts().reset_index()
-            df_esf.columns = ['Esfera', 'Qtd']
-            fig = px.pie(df_esf, values='Qtd', names='Esfera', hole=0.5)
-            st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-    with c_tab:
-        st.subheader("📋 Tabela de Órgãos (Filtrada)")
-        if not df_ativos.empty:
-            cols = [c for c in ['NOME', 'UF', 'MUNICIPIO', 'ESFERA_LIMPA'] if c in df_ativos.columns]
-            st.dataframe(df_ativos[cols], use_container_width=True, height=300)
-        else: st.info("Tabela vazia.")
+    def secao_orgaos():
+        c_esf, c_tab = st.columns([1, 2])
+        with c_esf:
+            st.subheader("🏛️ Por Esfera")
+            if not df_ativos.empty:
+                df_esf = df_ativos['ESFERA_LIMPA'].value_counts().reset_index()
+                df_esf.columns = ['Esfera', 'Qtd']
+                fig = px.pie(df_esf, values='Qtd', names='Esfera', hole=0.5)
+                exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+        with c_tab:
+            st.subheader("📋 Tabela de Órgãos (Filtrada)")
+            if not df_ativos.empty:
+                cols = [c for c in ['NOME', 'UF', 'MUNICIPIO', 'ESFERA_LIMPA'] if c in df_ativos.columns]
+                st.dataframe(df_ativos[cols], use_container_width=True, height=300)
+            else: st.info("Tabela vazia.")
 
-    st.divider()
-    
     # =========================================================================
     # --- 6. CAPACITAÇÕES E TREINAMENTOS (INTEGRADO NO PAINEL) ---
     # =========================================================================
-    st.markdown("### 🎓 Capacitações e Treinamentos Realizados")
+    def secao_capacitacoes():
+        st.markdown("### 🎓 Capacitações e Treinamentos Realizados")
     
-    # Carrega dados do Banco (tabela capacitacoes)
-    df_cap = carregar_capacitacoes()
+        # Carrega dados do Banco (tabela capacitacoes)
+        df_cap = pd.DataFrame()
+        try: df_cap = carregar_capacitacoes()
+        except ErroBanco as e: exibir_falha(e)
     
-    if not df_cap.empty:
-        # Métricas Rápidas
-        total_caps = len(df_cap)
-        total_parts = int(df_cap['QTD_PARTICIPANTES'].sum())
+        if not df_cap.empty:
+            # Métricas Rápidas
+            total_caps = len(df_cap)
+            total_parts = int(df_cap['QTD_PARTICIPANTES'].sum())
         
-        # Pega a data mais recente
-        if 'DATA_CAPACITACAO' in df_cap.columns:
-            ult_data = pd.to_datetime(df_cap['DATA_CAPACITACAO']).max().strftime('%d/%m/%Y')
-        else:
-            ult_data = "-"
+            # Pega a data mais recente
+            if 'DATA_CAPACITACAO' in df_cap.columns:
+                ult_data = pd.to_datetime(df_cap['DATA_CAPACITACAO']).max().strftime('%d/%m/%Y')
+            else:
+                ult_data = "-"
             
-        # Cards de Capacitação
-        k1, k2, k3 = st.columns(3)
-        with k1: st.markdown(html_card("Eventos", total_caps, "Realizados", tema), unsafe_allow_html=True)
-        with k2: st.markdown(html_card("Participantes", f"{total_parts:,}", "Total Capacitados", tema), unsafe_allow_html=True)
-        with k3: st.markdown(html_card("Último Evento", ult_data, "Data Recente", tema), unsafe_allow_html=True)
+            # Cards de Capacitação
+            k1, k2, k3 = st.columns(3)
+            with k1: st.markdown(html_card("Eventos", total_caps, "Realizados", tema), unsafe_allow_html=True)
+            with k2: st.markdown(html_card("Participantes", f"{total_parts:,}", "Total Capacitados", tema), unsafe_allow_html=True)
+            with k3: st.markdown(html_card("Último Evento", ult_data, "Data Recente", tema), unsafe_allow_html=True)
 
-        st.markdown("##### 📋 Histórico Detalhado")
+            st.markdown("##### 📋 Histórico Detalhado")
         
-        # Tratamento para Tabela
-        df_show = df_cap.copy()
-        if 'DATA_CAPACITACAO' in df_show.columns:
-            df_show['Data'] = pd.to_datetime(df_show['DATA_CAPACITACAO']).dt.strftime('%d/%m/%Y')
-        else: df_show['Data'] = "-"
+            # Tratamento para Tabela
+            df_show = df_cap.copy()
+            if 'DATA_CAPACITACAO' in df_show.columns:
+                df_show['Data'] = pd.to_datetime(df_show['DATA_CAPACITACAO']).dt.strftime('%d/%m/%Y')
+            else: df_show['Data'] = "-"
 
-        # Renomeia colunas para ficar bonito
-        rename_map = {
-            'ORDEM': 'Ordem',
-            'DESCRICAO': 'Descrição do Evento',
-            'TIPO': 'Tipo / Abrangência',
-            'LISTA_PRESENCA': 'Lista Presença',
-            'QTD_PARTICIPANTES': 'Participantes'
-        }
+            # Renomeia colunas para ficar bonito
+            rename_map = {
+                'ORDEM': 'Ordem',
+                'DESCRICAO': 'Descrição do Evento',
+                'TIPO': 'Tipo / Abrangência',
+                'LISTA_PRESENCA': 'Lista Presença',
+                'QTD_PARTICIPANTES': 'Participantes'
+            }
         
-        cols_order = ['Ordem', 'Data', 'Descrição do Evento', 'Participantes', 'Tipo / Abrangência', 'Lista Presença']
-        df_table = df_show.rename(columns=rename_map)
+            cols_order = ['Ordem', 'Data', 'Descrição do Evento', 'Participantes', 'Tipo / Abrangência', 'Lista Presença']
+            df_table = df_show.rename(columns=rename_map)
         
-        # Filtra colunas existentes
-        cols_final = [c for c in cols_order if c in df_table.columns]
+            # Filtra colunas existentes
+            cols_final = [c for c in cols_order if c in df_table.columns]
         
-        st.dataframe(
-            df_table[cols_final],
-            use_container_width=True,
-            hide_index=True,
-            column_config={
-                "Participantes": st.column_config.NumberColumn(format="%d"),
-                "Ordem": st.column_config.NumberColumn(format="%d")
-            }
-        )
-    else:
-        st.info("Nenhuma capacitação registrada no sistema.")
-
-    st.divider()
+            st.dataframe(
+                df_table[cols_final],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Participantes": st.column_config.NumberColumn(format="%d"),
+                    "Ordem": st.column_config.NumberColumn(format="%d")
+                }
+            )
+        else:
+            st.info("Nenhuma capacitação registrada no sistema.")
 
     # --- 7. REDE DE COLABORADORES ---
-    st.markdown("### 👥 Pontos Focais (Rede PNATRANS)")
+    def secao_pontos_focais():
+        st.markdown("### 👥 Pontos Focais (Rede PNATRANS)")
     
-    if not df_users.empty:
-        u1, u2 = st.columns(2)
-        with u1:
-            st.markdown("**Distribuição por Instituição**")
-            if 'ORGAO' in df_users.columns:
-                df_c = df_users['ORGAO'].value_counts().reset_index()
-                df_c.columns = ['Órgão', 'Qtd']
-                fig = px.bar(df_c.head(10), x='Qtd', y='Órgão', orientation='h', text_auto=True, color='Qtd', color_continuous_scale='Teal')
-                fig.update_layout(yaxis=dict(autorange="reversed"), yaxis_title=None)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        with u2:
-            st.markdown("**Pontos Focais por UF**")
-            if 'UF' in df_users.columns:
-                df_u = df_users['UF'].value_counts().reset_index()
-                df_u.columns = ['UF', 'Qtd']
-                fig = px.bar(df_u.sort_values('Qtd', ascending=False), x='UF', y='Qtd', text_auto=True, color='Qtd', color_continuous_scale='Blues')
-                fig.update_layout(xaxis_title=None)
-                st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
+        if not df_users.empty:
+            u1, u2 = st.columns(2)
+            with u1:
+                st.markdown("**Distribuição por Instituição**")
+                if 'ORGAO' in df_users.columns:
+                    df_c = df_users['ORGAO'].value_counts().reset_index()
+                    df_c.columns = ['Órgão', 'Qtd']
+                    fig = px.bar(df_c.head(10), x='Qtd', y='Órgão', orientation='h', text_auto=True, color='Qtd', color_continuous_scale='Teal')
+                    fig.update_layout(yaxis=dict(autorange="reversed"), yaxis_title=None)
+                    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
+            with u2:
+                st.markdown("**Pontos Focais por UF**")
+                if 'UF' in df_users.columns:
+                    df_u = df_users['UF'].value_counts().reset_index()
+                    df_u.columns = ['UF', 'Qtd']
+                    fig = px.bar(df_u.sort_values('Qtd', ascending=False), x='UF', y='Qtd', text_auto=True, color='Qtd', color_continuous_scale='Blues')
+                    fig.update_layout(xaxis_title=None)
+                    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
         
-        with st.expander("📋 Ver Lista de Pontos Focais"):
-            cols_hide = ['SENHA', 'PASSWORD', 'ID', 'TOKEN', 'CRIADO_EM', 'ATUALIZADO_EM']
-            cols = [c for c in df_users.columns if c not in cols_hide]
-            st.dataframe(df_users[cols], use_container_width=True)
-    else: st.info("Nenhum ponto focal encontrado.")
+            with st.expander("📋 Ver Lista de Pontos Focais"):
+                cols_hide = ['SENHA', 'PASSWORD', 'ID', 'TOKEN', 'CRIADO_EM', 'ATUALIZADO_EM']
+                cols = [c for c in df_users.columns if c not in cols_hide]
+                st.dataframe(df_users[cols], use_container_width=True)
+        else: st.info("Nenhum ponto focal encontrado.")
+
+    renderizar_abas('visao_geral', [
+        ("🗺️ Mapa & Status", secao_mapa),
+        ("📦 Produtos & Municípios", secao_produtos),
+        ("🏛️ Órgãos", secao_orgaos),
+        ("🎓 Capacitações", secao_capacitacoes),
+        ("👥 Pontos Focais", secao_pontos_focais),
+    ])
 
 # =========================================================================
 # --- 8. ANÁLISE TEMPORAL (MÊS E ANO COM MAIS PRODUTOS) ---
 # =========================================================================
-def render_analise_temporal(df_raw, tema):
+MESES_PT = {
+    1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
+    5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
+    9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
+}
+
+def render_analise_temporal(df_mensal, tema):
     st.markdown("### 📈 Evolução de Cadastros (Meses e Anos com mais entregas)")
     
-    if df_raw.empty:
-        st.warning("Sem dados para exibir na evolução.")
+    if df_mensal.empty:
+        st.warning("Sem dados para exibir na evolução. Verifique se o ETL gerou a tabela 'produtos_mensal'.")
         return
-        
-    if 'DATA_CADASTRO' in df_raw.columns:
-        df = df_raw.copy()
-        
-        # Converte para data verdadeira, forçando o formato brasileiro (dia/mês/ano)
-        df['DT'] = pd.to_datetime(df['DATA_CADASTRO'], errors='coerce', dayfirst=True).dropna()
-        
-        # 🚨 FILTRO ANTIBUG: Remove qualquer data que seja maior que a data de hoje (Futuro)
-        hoje = pd.Timestamp.today()
-        df = df[df['DT'] <= hoje]
-        
-        # Filtra apenas o que já foi REALIZADO
-        if 'STATUS_LIMPO' in df.columns: 
-            df = df[df['STATUS_LIMPO'] == 'REALIZADO'] 
-            
-        if not df.empty:
-            # Dicionário de tradução dos meses
-            meses_pt = {
-                1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
-                5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
-                9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
-            }
-            
-            # Cria a coluna invisível para ordenar cronologicamente (ex: '2023-10')
-            df['Ordem_Mes'] = df['DT'].dt.to_period('M').astype(str)
-            
-            # Cria a coluna bonita para exibir no eixo X (ex: 'Janeiro de 2025')
-            df['Mes_Exibicao'] = df['DT'].dt.month.map(meses_pt) + ' de ' + df['DT'].dt.year.astype(str)
-            
-            # Agrupa os dados
-            df_g = df.groupby(['Ordem_Mes', 'Mes_Exibicao']).size().reset_index(name='Qtd').sort_values('Ordem_Mes')
-            
-            # Gráfico de Barras colorido evidenciando o volume
-            fig = px.bar(df_g, x='Mes_Exibicao', y='Qtd', text_auto=True, 
-                         color='Qtd', color_continuous_scale='Blues',
-                         labels={'Mes_Exibicao': 'Período', 'Qtd': 'Produtos Entregues'})
-            
-            fig.update_layout(
-                xaxis_title="Mês e Ano", 
-                yaxis_title="Quantidade de Produtos",
-                xaxis={
-                    'type': 'category',
-                    'categoryorder': 'array',
-                    'categoryarray': df_g['Mes_Exibicao'] # Força a ordem exata
-                } 
-            )
-            
-            st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
-        else:
-            st.info("Nenhum produto com data de cadastro válida no passado foi encontrado.")
-    else:
-        st.warning("A coluna 'DATA_CADASTRO' não foi encontrada. Verifique se o ETL rodou com sucesso.")
\ No newline at end of file
+
+    # produtos_mensal já chega agregada por (MES, UF, status, produto) pelo ETL:
+    # aqui só se filtram e somam algumas centenas de linhas
+    st.sidebar.divider()
+    st.sidebar.subheader("🔍 Filtros")
+    ufs = sorted(df_mensal['UF_LIMPA'].dropna().unique())
+    sel_ufs = st.sidebar.multiselect("🗺️ Estado (UF):", ufs, placeholder="Todos (Brasil)")
+    status = sorted(df_mensal['STATUS_LIMPO'].dropna().unique())
+    sel_status = st.sidebar.multiselect("📌 Status:", status, default=[s for s in status if s == 'REALIZADO'],
+                                        placeholder="Todos os status")
+
+    # 🚨 FILTRO ANTIBUG: meses no futuro (o ETL já descarta datas posteriores à carga)
+    df = df_mensal[df_mensal['MES'] <= pd.Timestamp.today()]
+    if sel_ufs: df = df[df['UF_LIMPA'].isin(sel_ufs)]
+    if sel_status: df = df[df['STATUS_LIMPO'].isin(sel_status)]
+
+    if df.empty:
+        st.info("Nenhum produto com data de cadastro válida no passado foi encontrado.")
+        return
+
+    df_g = df.groupby('MES', as_index=False)['QUANTIDADE'].sum().rename(columns={'QUANTIDADE': 'Qtd'}).sort_values('MES')
+    # Rótulo do eixo X (ex: 'Janeiro de 2025'), na ordem cronológica de MES
+    df_g['Mes_Exibicao'] = df_g['MES'].dt.month.map(MESES_PT) + ' de ' + df_g['MES'].dt.year.astype(str)
+
+    # Gráfico de Barras colorido evidenciando o volume
+    fig = px.bar(df_g, x='Mes_Exibicao', y='Qtd', text_auto=True, 
+                 color='Qtd', color_continuous_scale='Blues',
+                 labels={'Mes_Exibicao': 'Período', 'Qtd': 'Produtos Entregues'})
+    
+    fig.update_layout(
+        xaxis_title="Mês e Ano", 
+        yaxis_title="Quantidade de Produtos",
+        xaxis={
+            'type': 'category',
+            'categoryorder': 'array',
+            'categoryarray': df_g['Mes_Exibicao'] # Força a ordem exata
+        } 
+    )
+    
+    exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
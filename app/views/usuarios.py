@@ -1,6 +1,7 @@
 import streamlit as st
 import plotly.express as px
 from utils import html_card, padronizar_grafico
+from graficos import exibir_grafico
 
 def render_rede(df_users, tema):
     st.markdown(f"### 👥 Colaboradores")
@@ -16,8 +17,8 @@ def render_rede(df_users, tema):
     c1, c2 = st.columns(2)
     with c1:
         fig = px.pie(df['PERFIL'].value_counts().reset_index(), values='count', names='PERFIL', hole=0.5)
-        st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
+        exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
     with c2:
         top = df['UF'].value_counts().head(10).reset_index()
         fig = px.bar(top, x='UF', y='count')
-        st.plotly_chart(padronizar_grafico(fig, tema), use_container_width=True)
\ No newline at end of file
+        exibir_grafico(padronizar_grafico(fig, tema), use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from banco import settings
+
+# --- VISÕES FILTRADAS (LRU LIMITADO POR BYTES) ---
+# Recortes da base compartilhada por chave de filtros normalizada, reaproveitados entre reruns e
+# sessões (trocar tema ou aba não refiltra nada). Um filtro que estreita uma seleção em cache é
+# resolvido sobre essa seleção, não sobre a base inteira. Os DataFrames são somente leitura.
+
+_visoes = OrderedDict()  # (dataset, versao, filtros, colunas) -> (DataFrame, bytes)
+_lock = threading.Lock()
+_uso = {'bytes': 0, 'acertos': 0, 'refinamentos': 0, 'varreduras': 0}
+
+def contem(filtros_amplos, filtros):
+    """A seleção 'filtros' está contida em 'filtros_amplos'? (dimensão vazia = todos os valores)"""
+    return all(not amplo or (novo and set(novo) <= set(amplo)) for amplo, novo in zip(filtros_amplos, filtros))
+
+def buscar_origem(dataset, versao, filtros, colunas):
+    """Menor visão em cache que contém a seleção pedida (e as colunas necessárias)."""
+    melhor = None
+    for (d, v, f, c), (df, _) in _visoes.items():
+        if d != dataset or v != versao or not contem(f, filtros): continue
+        if colunas and c and not set(colunas) <= set(c): continue
+        if c and not colunas: continue
+        if melhor is None or len(df) < len(melhor): melhor = df
+    return melhor
+
+def guardar(chave, df):
+    tamanho = int(df.memory_usage(deep=True).sum())
+    limite = settings.VISOES_MAX_MB * 1e6
+    if tamanho > limite: return
+    dataset, versao = chave[:2]
+    # Versões antigas da mesma base nunca mais serão pedidas
+    for antiga in [k for k in _visoes if k[0] == dataset and k[1] != versao]:
+        _uso['bytes'] -= _visoes.pop(antiga)[1]
+    _visoes[chave] = (df, tamanho)
+    _uso['bytes'] += tamanho
+    while _uso['bytes'] > limite:
+        _uso['bytes'] -= _visoes.popitem(last=False)[1][1]
+
+def visao_filtrada(dataset, versao, base, filtros, colunas, filtrar):
+    """
+    Recorte cacheado de 'base'. filtrar(origem, filtros, colunas) aplica a seleção completa;
+    como a origem pode ser uma visão mais ampla já filtrada, o resultado é o mesmo da base.
+    """
+    if not any(filtros): return filtrar(base, filtros, colunas)  # sem filtros: visão sem cópia
+    chave = (dataset, versao, filtros, colunas)
+    with _lock:
+        if chave in _visoes:
+            _visoes.move_to_end(chave)
+            _uso['acertos'] += 1
+            return _visoes[chave][0]
+        origem = buscar_origem(dataset, versao, filtros, colunas)
+        _uso['refinamentos' if origem is not None else 'varreduras'] += 1
+    df = filtrar(base if origem is None else origem, filtros, colunas)
+    with _lock: guardar(chave, df)
+    return df
+
+def estatisticas_visoes():
+    with _lock:
+        return {**_uso, 'visoes': len(_visoes), 'MB': round(_uso['bytes'] / 1e6, 1)}
@@ -0,0 +1,75 @@
+import json
+import numpy as np
+from urllib.request import urlopen
+
+# --- MALHAS DE UFs E MUNICÍPIOS ---
+# Fontes e simplificação (Douglas-Peucker) compartilhadas: scripts/gerar_geometrias.py grava os
+# níveis em data/geometrias e o dashboard (app/geometrias.py) usa o mesmo caminho quando falta o arquivo.
+
+FONTES = {
+    'ufs': ("https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson",
+            lambda p: {'sigla': p.get('sigla'), 'nome': p.get('name')}),
+    'municipios': ("https://servicodados.ibge.gov.br/api/v3/malhas/paises/BR?formato=application/vnd.geo+json&intrarregiao=municipio&qualidade=maxima",
+                   lambda p: {'id_ibge': int(p['codarea'])}),
+}
+
+# Nível -> (tolerância em graus, casas decimais das coordenadas)
+NIVEIS_GEOMETRIA = {
+    'alta': (0.002, 4),
+    'media': (0.01, 3),
+    'baixa': (0.05, 2),
+}
+
+def douglas_peucker(pontos, tolerancia):
+    """Máscara dos vértices mantidos (versão iterativa, sem recursão)."""
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[[0, -1]] = True
+    pilha = [(0, len(pontos) - 1)]
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2: continue
+        a, b = pontos[ini], pontos[fim]
+        meio = pontos[ini + 1:fim]
+        ab = b - a
+        norma = np.hypot(*ab)
+        if norma == 0:
+            dist = np.hypot(*(meio - a).T)
+        else:
+            dist = np.abs(ab[0] * (meio[:, 1] - a[1]) - ab[1] * (meio[:, 0] - a[0])) / norma
+        i = int(np.argmax(dist))
+        if dist[i] > tolerancia:
+            k = ini + 1 + i
+            manter[k] = True
+            pilha += [(ini, k), (k, fim)]
+    return manter
+
+def simplificar_anel(anel, tolerancia, casas):
+    pontos = np.asarray(anel, dtype=float)[:, :2]
+    pontos = np.round(pontos[douglas_peucker(pontos, tolerancia)], casas)
+    # Remove vértices repetidos pelo arredondamento; anel precisa de ao menos 4 pontos (fechado)
+    pontos = pontos[np.r_[True, np.any(np.diff(pontos, axis=0) != 0, axis=1)]]
+    return pontos.tolist() if len(pontos) >= 4 else None
+
+def simplificar_geometria(geometria, tolerancia, casas):
+    poligonos = geometria['coordinates'] if geometria['type'] == 'MultiPolygon' else [geometria['coordinates']]
+    saida = []
+    for poligono in poligonos:
+        aneis = [simplificar_anel(anel, tolerancia, casas) for anel in poligono]
+        if aneis[0] is None: continue  # contorno externo sumiu: polígono menor que a tolerância
+        saida.append([a for a in aneis if a is not None])
+    if not saida: return None
+    return {'type': 'MultiPolygon', 'coordinates': saida}
+
+def baixar(url):
+    with urlopen(url, timeout=120) as resposta:
+        return json.load(resposta)
+
+def simplificar_camada(origem, camada, nivel):
+    """FeatureCollection da malha original simplificada no nível, só com as propriedades usadas pelo dashboard."""
+    _, propriedades = FONTES[camada]
+    tolerancia, casas = NIVEIS_GEOMETRIA[nivel]
+    features = []
+    for f in origem['features']:
+        geometria = simplificar_geometria(f['geometry'], tolerancia, casas)
+        if geometria: features.append({'type': 'Feature', 'properties': propriedades(f['properties']), 'geometry': geometria})
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,138 @@
+import pandas as pd
+from sqlalchemy.types import String, Integer, SmallInteger, Text, Float, Date
+
+# --- CONTRATO DE TIPOS ETL <-> DASHBOARD ---
+# coluna -> (tipo no banco, dtype pandas, valor padrão para nulos)
+# O ETL grava exatamente estes tipos (aplicar_schema); os loaders do dashboard
+# leem com dtype/parse_dates derivados daqui e não fazem nenhuma conversão linha a linha.
+# Inteiros nunca são nulos: 0 (ou -1 em HORA_INT) significa "não informado".
+
+NAO_INFORMADO = 'NÃO INFORMADO'
+
+SCHEMA_PRF = {
+    'ID': (Integer(), 'int64', 0),
+    'PESID': (Integer(), 'int64', 0),
+    'DATA_INVERSA': (Date(), 'datetime64[ns]', None),
+    'DIA_SEMANA': (Text(), 'object', NAO_INFORMADO),
+    'HORARIO': (String(10), 'object', NAO_INFORMADO),
+    'HORA_INT': (SmallInteger(), 'int64', -1),
+    'UF': (String(10), 'object', NAO_INFORMADO),
+    'BR': (String(20), 'object', NAO_INFORMADO),
+    'KM': (String(50), 'object', NAO_INFORMADO),
+    'MUNICIPIO': (Text(), 'object', NAO_INFORMADO),
+    'CAUSA_PRINCIPAL': (Text(), 'object', NAO_INFORMADO),
+    'TIPO_ACIDENTE': (Text(), 'object', NAO_INFORMADO),
+    'CLASSIFICACAO_ACIDENTE': (Text(), 'object', NAO_INFORMADO),
+    'FASE_DIA': (Text(), 'object', NAO_INFORMADO),
+    'SENTIDO_VIA': (Text(), 'object', NAO_INFORMADO),
+    'CONDICAO_METEREOLOGICA': (Text(), 'object', NAO_INFORMADO),
+    'TIPO_PISTA': (Text(), 'object', NAO_INFORMADO),
+    'TRACADO_VIA': (Text(), 'object', NAO_INFORMADO),
+    'USO_SOLO': (Text(), 'object', NAO_INFORMADO),
+    'ID_VEICULO': (Integer(), 'int64', 0),
+    'TIPO_VEICULO': (Text(), 'object', NAO_INFORMADO),
+    'MARCA': (Text(), 'object', NAO_INFORMADO),
+    'ANO_FABRICACAO_VEICULO': (Integer(), 'int64', 0),
+    'TIPO_ENVOLVIDO': (Text(), 'object', NAO_INFORMADO),
+    'ESTADO_FISICO': (String(50), 'object', NAO_INFORMADO),
+    'IDADE': (Integer(), 'int64', 0),
+    'SEXO': (Text(), 'object', NAO_INFORMADO),
+    'ILESOS': (Integer(), 'int64', 0),
+    'FERIDOS_LEVES': (Integer(), 'int64', 0),
+    'FERIDOS_GRAVES': (Integer(), 'int64', 0),
+    'MORTOS': (Integer(), 'int64', 0),
+    'FERIDOS': (Integer(), 'int64', 0),
+    'LATITUDE': (Float(), 'float64', None),
+    'LONGITUDE': (Float(), 'float64', None),
+    'LAT': (Float(), 'float64', None),
+    'LON': (Float(), 'float64', None),
+    'REGIONAL': (Text(), 'object', NAO_INFORMADO),
+    'DELEGACIA': (Text(), 'object', NAO_INFORMADO),
+    'UOP': (Text(), 'object', NAO_INFORMADO),
+    'ANO': (Integer(), 'int64', 0),
+    'MES': (Integer(), 'int64', 0),
+    'COD_IBGE': (Integer(), 'int64', 0),
+    'CELULA_N1': (Integer(), 'int64', 0),
+    'CELULA_N2': (Integer(), 'int64', 0),
+    'CELULA_N3': (Integer(), 'int64', 0),
+    'CELULA_N4': (Integer(), 'int64', 0),
+}
+
+SCHEMA_PRODUTOS = {
+    'UF_LIMPA': (String(2), 'object', None),
+    'STATUS_LIMPO': (String(30), 'object', 'NAO INFORMADO'),
+    'MUNICIPIO_LIMPO': (String(150), 'object', 'NAO INFORMADO'),
+    'COD_PRODUTO': (String(30), 'object', 'ND'),
+    'DESC_PRODUTO': (Text(), 'object', 'Não Informado'),
+    'DATA_CADASTRO': (Date(), 'datetime64[ns]', None),
+    'COD_IBGE': (Integer(), 'int64', 0),
+}
+
+# Cadastros por (mês, UF, status, produto); MES é o primeiro dia do mês de DATA_CADASTRO
+SCHEMA_PRODUTOS_MENSAL = {
+    'MES': (Date(), 'datetime64[ns]', None),
+    'UF_LIMPA': (String(2), 'object', None),
+    'STATUS_LIMPO': (String(30), 'object', 'NAO INFORMADO'),
+    'COD_PRODUTO': (String(30), 'object', 'ND'),
+    'QUANTIDADE': (Integer(), 'int64', 0),
+}
+
+# --- TIPOS EM MEMÓRIA (DASHBOARD) ---
+# O banco mantém os tipos do contrato; no processo do Streamlit o frame PRF fica compacto:
+# categorias nas dimensões de baixa cardinalidade, strings Arrow no restante e números estreitos.
+CATEGORIA = 'category'
+TEXTO_ARROW = 'string[pyarrow]'
+
+COMPACTO_PRF = {
+    'ID': 'int32', 'PESID': 'int32', 'ID_VEICULO': 'int32', 'COD_IBGE': 'int32',
+    'CELULA_N1': 'int32', 'CELULA_N2': 'int32', 'CELULA_N3': 'int32', 'CELULA_N4': 'int32',
+    'ANO': 'int16', 'ANO_FABRICACAO_VEICULO': 'int16', 'IDADE': 'int16',
+    'MES': 'int8', 'HORA_INT': 'int8',
+    'ILESOS': 'int8', 'FERIDOS_LEVES': 'int8', 'FERIDOS_GRAVES': 'int8', 'MORTOS': 'int8', 'FERIDOS': 'int8',
+    'LATITUDE': 'float32', 'LONGITUDE': 'float32', 'LAT': 'float32', 'LON': 'float32',
+    'DIA_SEMANA': CATEGORIA, 'UF': CATEGORIA, 'BR': CATEGORIA, 'CAUSA_PRINCIPAL': CATEGORIA,
+    'TIPO_ACIDENTE': CATEGORIA, 'CLASSIFICACAO_ACIDENTE': CATEGORIA, 'FASE_DIA': CATEGORIA,
+    'SENTIDO_VIA': CATEGORIA, 'CONDICAO_METEREOLOGICA': CATEGORIA, 'TIPO_PISTA': CATEGORIA,
+    'TRACADO_VIA': CATEGORIA, 'USO_SOLO': CATEGORIA, 'TIPO_VEICULO': CATEGORIA,
+    'TIPO_ENVOLVIDO': CATEGORIA, 'ESTADO_FISICO': CATEGORIA, 'SEXO': CATEGORIA,
+    'REGIONAL': CATEGORIA, 'DELEGACIA': CATEGORIA, 'UOP': CATEGORIA,
+    'HORARIO': TEXTO_ARROW, 'KM': TEXTO_ARROW, 'MUNICIPIO': TEXTO_ARROW, 'MARCA': TEXTO_ARROW,
+}
+
+# Tabela do banco -> contrato
+SCHEMAS = {
+    'acidentes_prf': SCHEMA_PRF,
+    'produtos_completo': SCHEMA_PRODUTOS,
+    'produtos_mensal': SCHEMA_PRODUTOS_MENSAL,
+}
+
+def tipos_sql(schema):
+    """Tipos SQLAlchemy para o to_sql do ETL."""
+    return {c: t[0] for c, t in schema.items()}
+
+def tipos_pandas(schema, colunas=None, compacto=None):
+    """dtype para o read_sql dos loaders (datas ficam em colunas_data); 'compacto' sobrepõe os tipos em memória."""
+    colunas = colunas or list(schema)
+    compacto = compacto or {}
+    return {c: compacto.get(c, schema[c][1]) for c in colunas if c in schema and not schema[c][1].startswith('datetime')}
+
+def colunas_data(schema, colunas=None):
+    colunas = colunas or list(schema)
+    return [c for c in colunas if c in schema and schema[c][1].startswith('datetime')]
+
+def aplicar_schema(df, schema):
+    """
+    Lado ETL: garante todas as colunas do contrato com o tipo final
+    (nulos trocados pelo padrão) e descarta as que não fazem parte dele.
+    """
+    for col, (_, dtype, padrao) in schema.items():
+        if col not in df.columns: df[col] = padrao
+        if dtype.startswith('datetime'):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype.startswith('int'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(padrao).astype(dtype)
+        elif dtype.startswith('float'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        elif padrao is not None:
+            df[col] = df[col].fillna(padrao).astype(str).replace('nan', padrao)
+    return df[list(schema)]
@@ -12,21 +12,65 @@ DB_PASSWORD = os.getenv('DB_PASSWORD', 'Jjjb3509')
 DB_NAME = os.getenv('DB_NAME', 'db_pnatrans')
 
 # String de conexão
-DATABASE_URL = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+DATABASE_URL = os.getenv('DATABASE_URL', f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}')
+
+# Pool de conexões do dashboard (um único engine por processo)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '8'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+# Quantidade de consultas recentes mantidas para o painel de desempenho
+DB_HISTORICO_CONSULTAS = 500
 
 # --- CONFIGURAÇÕES DA APLICAÇÃO ---
 APP_TITLE = "Monitoramento PNATRANS"
 APP_ICON = "📊"
 APP_LAYOUT = "wide"
+# Abas das páginas: True executa só a aba aberta (seletor de seção); False usa st.tabs com todas
+NAVEGACAO_SOB_DEMANDA = os.getenv('NAVEGACAO_SOB_DEMANDA', 'True').lower() == 'true'
 
 # --- CAMINHOS ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PLANILHAS_DIR = os.path.join(BASE_DIR, 'Planilhas')
 SCRIPTS_DIR = os.path.join(BASE_DIR, 'scripts')
 CONFIG_DIR = os.path.join(BASE_DIR, 'config')
+GEOMETRIAS_DIR = os.path.join(BASE_DIR, 'data', 'geometrias')
+
+# --- SNAPSHOTS COMPARTILHADOS (Arrow IPC mapeado em memória) ---
+USAR_SNAPSHOTS = os.getenv('USAR_SNAPSHOTS', 'True').lower() == 'true'
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(BASE_DIR, 'data', 'snapshots'))
+# Teto (MB) do cache de recortes filtrados da base compartilhada (app/visoes.py)
+VISOES_MAX_MB = int(os.getenv('VISOES_MAX_MB', '512'))
 
-# --- CACHE TTL (em segundos) ---
+# --- VALIDADE DOS CACHES (em segundos) ---
+# Os caches seguem a versão de cada tabela carimbada pelo ETL (etl_versoes), checada a cada VERSAO_INTERVALO.
+# Tabelas sem carimbo expiram em janelas de CACHE_TTL_SEM_CARIMBO (como o ttl=3600 original dos loaders);
+# só as tabelas pequenas de TTL_SEM_CARIMBO usam a janela curta de CACHE_TTL.
+VERSAO_INTERVALO = int(os.getenv('VERSAO_INTERVALO', '30'))
 CACHE_TTL = 300
+CACHE_TTL_SEM_CARIMBO = int(os.getenv('CACHE_TTL_SEM_CARIMBO', '3600'))
+TTL_SEM_CARIMBO = {'capacitacoes': CACHE_TTL}
+# Teto (MB) dos datasets em cache nos loaders (app/cache_orcado.py); acima dele saem as entradas
+# menos usadas, pesando tamanho e custo de recarga. A base compartilhada e as visões têm teto próprio.
+CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', '1024'))
+
+# --- MOTOR ANALÍTICO ---
+# 'pandas' (padrão) ou 'duckdb' (requer: pip install duckdb) para agregar()/contar(): página de Óbitos e
+# grade do mapa PRF. Os agregados das abas PRF saem de agregados.calcular_agregados (numpy) em qualquer motor
+MOTOR_ANALITICO = os.getenv('MOTOR_ANALITICO', 'pandas').lower()
+DUCKDB_THREADS = int(os.getenv('DUCKDB_THREADS', str(os.cpu_count() or 4)))
+
+# --- GRÁFICOS ---
+# Orçamento (KB de JSON por gráfico); acima dele a figura é reduzida antes do envio (app/graficos.py)
+GRAFICO_MAX_KB = int(os.getenv('GRAFICO_MAX_KB', '500'))
+
+# --- AQUECIMENTO ---
+# Endpoint de prontidão (200 quando os caches estão aquecidos, 503 antes). Só o lançador (app/servidor.py)
+# o sobe; com 'streamlit run' apenas se PRONTIDAO=True. Escuta em localhost salvo HOST_PRONTIDAO explícito.
+PRONTIDAO = os.getenv('PRONTIDAO', 'False').lower() == 'true'
+HOST_PRONTIDAO = os.getenv('HOST_PRONTIDAO', '127.0.0.1')
+PORTA_PRONTIDAO = int(os.getenv('PORTA_PRONTIDAO', '8502'))
 
 # --- DEBUG ---
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,123 @@
+import pandas as pd
+import unicodedata
+import re
+from sqlalchemy import text
+from sqlalchemy.types import String, Integer
+
+# --- DIMENSÃO DE MUNICÍPIOS (CHAVE IBGE) ---
+# Construída a partir de 'populacao_ibge' (ou 'municipios') e usada pelos ETLs
+# para carimbar COD_IBGE nas bases PRF, produtos e capacitações.
+
+# Grafias antigas/alternativas -> nome oficial IBGE (já normalizados)
+ALIASES_MUNICIPIOS = {
+    ('SP', 'EMBU'): 'EMBU DAS ARTES',
+    ('SP', 'MOJI MIRIM'): 'MOGI MIRIM',
+    ('SP', 'MOJI GUACU'): 'MOGI GUACU',
+    ('SP', 'MOJI DAS CRUZES'): 'MOGI DAS CRUZES',
+    ('SP', 'SAO LUIS DO PARAITINGA'): 'SAO LUIZ DO PARAITINGA',
+    ('RJ', 'PARATI'): 'PARATY',
+    ('RJ', 'TRAJANO DE MORAIS'): 'TRAJANO DE MORAES',
+    ('MG', 'SAO TOME DAS LETRAS'): 'SAO THOME DAS LETRAS',
+    ('MG', 'BRASOPOLIS'): 'BRAZOPOLIS',
+    ('PA', 'ELDORADO DOS CARAJAS'): 'ELDORADO DO CARAJAS',
+    ('PA', 'SANTA IZABEL DO PARA'): 'SANTA ISABEL DO PARA',
+    ('RN', 'ASSU'): 'ACU',
+    ('RN', 'AUGUSTO SEVERO'): 'CAMPO GRANDE',
+    ('PB', 'SANTAREM'): 'JOCA CLAUDINO',
+    ('PE', 'BELEM DE SAO FRANCISCO'): 'BELEM DO SAO FRANCISCO',
+    ('BA', 'MUQUEM DE SAO FRANCISCO'): 'MUQUEM DO SAO FRANCISCO',
+    ('TO', 'SAO VALERIO DA NATIVIDADE'): 'SAO VALERIO',
+    ('MT', 'POXOREO'): 'POXOREU',
+    ('GO', 'BOM JESUS'): 'BOM JESUS DE GOIAS',
+    ('SC', 'PRESIDENTE CASTELO BRANCO'): 'PRESIDENTE CASTELLO BRANCO',
+}
+
+def normalizar_municipio(texto):
+    """Chave de comparação: sem acentos, maiúscula, sem apóstrofos e hífens."""
+    if pd.isna(texto): return ""
+    nfkd = unicodedata.normalize('NFKD', str(texto).upper())
+    s = "".join([c for c in nfkd if not unicodedata.combining(c)])
+    s = re.sub(r"['`´]", '', s).replace('-', ' ')
+    return re.sub(r'\s+', ' ', s).strip()
+
+def ler_municipios_ibge(engine):
+    """Lê a base de municípios com código IBGE (populacao_ibge ou municipios)."""
+    consultas = [
+        "SELECT id_ibge, uf, municipio FROM populacao_ibge",
+        "SELECT id_ibge, uf, nome_municipio AS municipio FROM municipios",
+    ]
+    for sql in consultas:
+        try:
+            with engine.connect() as conn:
+                df = pd.read_sql(sql, conn)
+            if not df.empty: return df
+        except Exception as e:
+            print(f"  Aviso: consulta de municípios falhou ({sql.split('FROM')[1].strip()}): {e}")
+    return pd.DataFrame()
+
+def construir_dimensao_municipios(engine):
+    """
+    Cria 'dim_municipio' (chave id_ibge) e 'dim_municipio_alias' (UF + nome normalizado -> id_ibge).
+    Retorna o índice {(UF, NOME_NORM): id_ibge} para uso imediato no ETL.
+    """
+    print("\n--- CONSTRUINDO DIMENSÃO DE MUNICÍPIOS (IBGE) ---")
+    df = ler_municipios_ibge(engine)
+    if df.empty:
+        print("  ⚠️ Base de municípios não encontrada. COD_IBGE ficará vazio.")
+        return {}
+
+    df['id_ibge'] = pd.to_numeric(df['id_ibge'], errors='coerce')
+    df = df.dropna(subset=['id_ibge']).drop_duplicates(subset=['id_ibge'])
+    df['id_ibge'] = df['id_ibge'].astype(int)
+    df['uf'] = df['uf'].astype(str).str.upper().str.strip()
+    df['municipio_norm'] = df['municipio'].apply(normalizar_municipio)
+    dim = df[['id_ibge', 'uf', 'municipio', 'municipio_norm']]
+
+    # Índice de nomes: nome oficial + aliases conhecidos
+    alias = dim[['uf', 'municipio_norm', 'id_ibge']].rename(columns={'municipio_norm': 'nome_norm'})
+    oficial = {(r.uf, r.nome_norm): r.id_ibge for r in alias.itertuples(index=False)}
+    extras = [(uf, nome, oficial[(uf, alvo)]) for (uf, nome), alvo in ALIASES_MUNICIPIOS.items() if (uf, alvo) in oficial]
+    alias = pd.concat([alias, pd.DataFrame(extras, columns=['uf', 'nome_norm', 'id_ibge'])], ignore_index=True)
+    alias = alias.drop_duplicates(subset=['uf', 'nome_norm'])
+
+    try:
+        with engine.connect() as conn:
+            with conn.begin():
+                dim.to_sql('dim_municipio', con=conn, if_exists='replace', index=False,
+                           dtype={'id_ibge': Integer(), 'uf': String(2), 'municipio': String(150), 'municipio_norm': String(150)})
+                alias.to_sql('dim_municipio_alias', con=conn, if_exists='replace', index=False,
+                             dtype={'uf': String(2), 'nome_norm': String(150), 'id_ibge': Integer()})
+                conn.execute(text("ALTER TABLE dim_municipio ADD PRIMARY KEY (id_ibge)"))
+                conn.execute(text("CREATE INDEX idx_dim_nome ON dim_municipio (uf, municipio_norm)"))
+                conn.execute(text("CREATE UNIQUE INDEX idx_alias ON dim_municipio_alias (uf, nome_norm)"))
+        print(f"  ✓ dim_municipio: {len(dim):,} municípios / {len(alias):,} nomes indexados.")
+    except Exception as e:
+        print(f"  ERRO ao salvar dimensão de municípios: {e}")
+
+    return {(r.uf, r.nome_norm): int(r.id_ibge) for r in alias.itertuples(index=False)}
+
+def carregar_indice_municipios(engine):
+    """Lê o índice de nomes já persistido (para ETLs que rodam isoladamente)."""
+    try:
+        with engine.connect() as conn:
+            df = pd.read_sql("SELECT uf, nome_norm, id_ibge FROM dim_municipio_alias", conn)
+        return {(r.uf, r.nome_norm): int(r.id_ibge) for r in df.itertuples(index=False)}
+    except Exception as e:
+        print(f"  Aviso: dimensão de municípios indisponível ({e}). Rode etl_populacao.py primeiro.")
+        return {}
+
+def atribuir_cod_ibge(df, col_uf, col_mun, indice):
+    """Carimba COD_IBGE (inteiro, nulo se não resolvido) normalizando só os pares UF/município distintos."""
+    if df.empty or col_uf not in df.columns or col_mun not in df.columns:
+        df['COD_IBGE'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+        return df
+
+    pares = df[[col_uf, col_mun]].astype(str)
+    codigos, unicos = pd.factorize(pd.MultiIndex.from_frame(pares))
+    resolvidos = [indice.get((str(uf).upper().strip(), normalizar_municipio(mun))) for uf, mun in unicos]
+    mapa = pd.array(resolvidos + [None], dtype='Int64')
+    df['COD_IBGE'] = mapa[codigos]  # código -1 (nulo) cai na última posição
+
+    taxa = df['COD_IBGE'].notna().mean() * 100
+    print(f"  -> COD_IBGE resolvido em {taxa:.1f}% das linhas ({len(unicos):,} pares UF/município).")
+    return df
@@ -2,6 +2,8 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import re
 import os
+from dim_municipios import construir_dimensao_municipios, normalizar_municipio
+from versoes_etl import carimbar_versao
 
 # --- CONFIGURAÇÕES ---
 # Caminho do arquivo (Ajuste se necessário)
@@ -34,7 +36,10 @@ def salvar_no_banco(df, nome_tabela, engine):
             if nome_tabela == 'populacao_ibge':
                 conn.execute(text("CREATE INDEX idx_pop_uf ON populacao_ibge (uf)"))
                 conn.execute(text("CREATE INDEX idx_pop_mun ON populacao_ibge (municipio)"))
+                if 'id_ibge' in df.columns:
+                    conn.execute(text("CREATE INDEX idx_pop_ibge ON populacao_ibge (id_ibge)"))
                 conn.commit()
+        carimbar_versao(engine, nome_tabela)
                 
         print(f"✅ Tabela '{nome_tabela}' atualizada com sucesso ({len(df)} registros).")
     except Exception as e:
@@ -106,6 +111,15 @@ def processar_planilha():
             termos_ignorar = ['BRASIL', 'REGIÃO', 'UNIDADE DA FEDERAÇÃO']
             df = df[~df['municipio'].str.upper().isin(termos_ignorar)]
 
+            # Código IBGE completo (UF + MUNIC), chave da dimensão de municípios
+            col_cod_uf = next((c for c in df_original.columns if 'COD' in normalizar_municipio(c) and 'UF' in c and 'MUNIC' not in c), None)
+            col_cod_mun = next((c for c in df_original.columns if 'COD' in normalizar_municipio(c) and 'MUNIC' in c), None)
+            if col_cod_uf and col_cod_mun:
+                cod_uf = pd.to_numeric(df_original.loc[df.index, col_cod_uf], errors='coerce')
+                cod_mun = pd.to_numeric(df_original.loc[df.index, col_cod_mun], errors='coerce')
+                df['id_ibge'] = (cod_uf * 100000 + cod_mun).astype('Int64')
+                df = df[df['id_ibge'].notna() & (cod_mun > 0)]
+
             dfs_para_salvar.append(df)
 
     if dfs_para_salvar:
@@ -114,6 +128,10 @@ def processar_planilha():
         
         # Salva na tabela 'populacao_ibge' que o Dashboard vai usar
         salvar_no_banco(df_final, 'populacao_ibge', engine)
+        
+        # Dimensão de municípios (id_ibge + índice de nomes) usada pelos demais ETLs
+        if 'id_ibge' in df_final.columns:
+            construir_dimensao_municipios(engine)
     else:
         print("⚠️ Nenhuma aba com dados de município/população encontrada.")
 
@@ -0,0 +1,30 @@
+import json
+import os
+import sys
+
+# Raiz do projeto no path para os caminhos em config/settings.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import GEOMETRIAS_DIR
+from config.malhas import FONTES, NIVEIS_GEOMETRIA, baixar, simplificar_camada
+
+# --- GEOMETRIAS LOCAIS EM VÁRIAS RESOLUÇÕES ---
+# Baixa as malhas uma única vez (fora do dashboard), simplifica cada anel com Douglas-Peucker
+# (config/malhas.py) e grava um GeoJSON por camada e nível em data/geometrias. O dashboard só
+# lê esses arquivos.
+# Rodar de novo apenas quando as malhas oficiais mudarem.
+
+def gerar_camada(camada):
+    url, _ = FONTES[camada]
+    print(f"\n--- {camada.upper()} ---\n  Baixando {url}")
+    origem = baixar(url)
+    os.makedirs(GEOMETRIAS_DIR, exist_ok=True)
+    for nivel in NIVEIS_GEOMETRIA:
+        colecao = simplificar_camada(origem, camada, nivel)
+        destino = os.path.join(GEOMETRIAS_DIR, f"{camada}_{nivel}.geojson")
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            json.dump(colecao, arquivo, separators=(',', ':'))
+        print(f"  ✓ {os.path.basename(destino)}: {len(colecao['features']):,} feições, {os.path.getsize(destino) / 1e6:.2f} MB")
+
+if __name__ == "__main__":
+    for camada in sys.argv[1:] or list(FONTES):
+        gerar_camada(camada)
@@ -0,0 +1,32 @@
+import time
+from datetime import datetime
+from sqlalchemy import text
+
+# --- CARIMBO DE VERSÃO POR TABELA ---
+# Cada carga bem-sucedida grava (tabela, versao) em 'etl_versoes'. O dashboard consulta
+# esses carimbos periodicamente e recarrega apenas os datasets cuja tabela mudou.
+
+SQL_CRIAR = """
+CREATE TABLE IF NOT EXISTS etl_versoes (
+    tabela VARCHAR(64) PRIMARY KEY,
+    versao BIGINT NOT NULL,
+    atualizado_em DATETIME NOT NULL
+)
+"""
+
+def carimbar_versao(engine, *tabelas):
+    """Grava uma nova versão (nanossegundos desde a época) para as tabelas recém-carregadas."""
+    versao = time.time_ns()
+    try:
+        with engine.connect() as conn:
+            with conn.begin():
+                conn.execute(text(SQL_CRIAR))
+                for tabela in tabelas:
+                    conn.execute(text("DELETE FROM etl_versoes WHERE tabela = :tabela"), {'tabela': tabela})
+                    conn.execute(
+                        text("INSERT INTO etl_versoes (tabela, versao, atualizado_em) VALUES (:tabela, :versao, :momento)"),
+                        {'tabela': tabela, 'versao': versao, 'momento': datetime.now()},
+                    )
+        print(f"  -> Versão {versao} carimbada: {', '.join(tabelas)}")
+    except Exception as e:
+        print(f"  Aviso: versão de {', '.join(tabelas)} não carimbada ({e}). O dashboard só recarrega pelo CACHE_TTL_SEM_CARIMBO.")
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# Os módulos do dashboard se importam como no 'streamlit run app/main.py' (app/ no path)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'app'))
+
+import cache_orcado
+import coalescencia
+
+@pytest.fixture
+def estado_limpo():
+    """Zera o estado em memória do cache com orçamento e das cargas coalescidas entre os testes."""
+    def limpar():
+        cache_orcado._entradas.clear()
+        cache_orcado._travas.clear()
+        cache_orcado._uso.clear()
+        cache_orcado._estado.update(bytes=0, relogio=0.0)
+        coalescencia.aguardar_atualizacoes()
+        for estado in (coalescencia._prontos, coalescencia._em_voo, coalescencia._atualizacoes, coalescencia._falhas):
+            estado.clear()
+    limpar()
+    yield
+    limpar()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+import agregados
+from agregados import calcular_agregados, mascara_valores
+
+# calcular_agregados (bincount sobre códigos) contra o groupby do pandas: chaves nulas fora,
+# categorias não observadas fora, mesma ordem (valor decrescente, empate pela chave)
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(7)
+    n = 2000
+    uf = rng.choice(['SP', 'RJ', 'MG', None], n)
+    tipo = pd.Categorical(rng.choice(['Automóvel', 'Moto', 'Ônibus', None], n),
+                          categories=['Automóvel', 'Caminhão', 'Moto', 'Ônibus'])  # 'Caminhão' sem linhas
+    mortos = rng.integers(0, 3, n)
+    idade = rng.integers(0, 90, n).astype(float)
+    idade[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({'UF': uf, 'TIPO': tipo, 'ID': rng.integers(0, 300, n), 'MORTOS': mortos, 'IDADE': idade})
+
+MEDIDAS = {'pessoas': ('ID', 'size'), 'sinistros': ('ID', 'nunique'), 'mortos': ('MORTOS', 'sum'), 'idade': ('IDADE', 'mean')}
+
+def referencia(df, chaves, medidas, top=None):
+    grupos = df.dropna(subset=chaves).groupby(chaves, observed=True)
+    res = grupos.agg(**medidas).reset_index()
+    for chave in chaves:
+        if isinstance(res[chave].dtype, pd.CategoricalDtype): res[chave] = res[chave].astype(str)
+    res = res.sort_values([next(iter(medidas))] + chaves, ascending=[False] + [True] * len(chaves),
+                          kind='stable', ignore_index=True)
+    return res.head(top) if top else res
+
+def comparar(obtido, esperado):
+    pd.testing.assert_frame_equal(obtido.reset_index(drop=True), esperado.reset_index(drop=True),
+                                  check_dtype=False, check_exact=False)
+
+@pytest.mark.parametrize('chaves', [['UF'], ['TIPO'], ['UF', 'TIPO'], ['TIPO', 'UF']])
+def test_grupos_iguais_ao_groupby(df, chaves):
+    res = calcular_agregados(df, {'item': {'chaves': chaves, 'medidas': MEDIDAS}})['item']
+    comparar(res, referencia(df, chaves, MEDIDAS))
+
+def test_chaves_nulas_e_categorias_sem_linhas_ficam_de_fora(df):
+    res = calcular_agregados(df, {'item': {'chaves': ['UF', 'TIPO'], 'medidas': MEDIDAS}})['item']
+    assert res['UF'].notna().all()
+    assert set(res['TIPO']) == {'Automóvel', 'Moto', 'Ônibus'}
+
+def test_top_e_tipos_do_resultado(df):
+    res = calcular_agregados(df, {'item': {'chaves': ['UF'], 'medidas': MEDIDAS, 'top': 2}})['item']
+    comparar(res, referencia(df, ['UF'], MEDIDAS, top=2))
+    assert res.dtypes.to_dict() == {'UF': object, 'pessoas': 'int64', 'sinistros': 'int64', 'mortos': 'int64', 'idade': 'float64'}
+
+def test_caminho_np_unique_igual_ao_bincount(df, monkeypatch):
+    monkeypatch.setattr(agregados, 'LIMITE_BINCOUNT', 0)
+    res = calcular_agregados(df, {'item': {'chaves': ['UF', 'TIPO'], 'medidas': MEDIDAS}})['item']
+    comparar(res, referencia(df, ['UF', 'TIPO'], MEDIDAS))
+
+def test_condicoes_e_predicados(df):
+    condicoes = {'fatal': lambda d, f: (d['MORTOS'] > 0).to_numpy()}
+    itens = {'item': {'chaves': ['TIPO'], 'medidas': MEDIDAS, 'onde': ['fatal'], 'se': {'UF': lambda v: v != 'SP'}}}
+    res = calcular_agregados(df, itens, condicoes)['item']
+    # UF nula não passa no predicado (nulos ficam de fora da máscara)
+    esperado = df[(df['MORTOS'] > 0) & df['UF'].notna() & (df['UF'] != 'SP')]
+    comparar(res, referencia(esperado, ['TIPO'], MEDIDAS))
+
+def test_totais_sem_chaves(df):
+    res = calcular_agregados(df, {'kpis': {'medidas': MEDIDAS}})['kpis'].iloc[0]
+    assert res['pessoas'] == len(df)
+    assert res['sinistros'] == df['ID'].nunique()
+    assert res['mortos'] == df['MORTOS'].sum()
+    assert res['idade'] == pytest.approx(df['IDADE'].mean())
+
+def test_derivadas(df):
+    derivadas = {'GRUPO': ('TIPO', lambda v: 'Duas rodas' if v == 'Moto' else 'Outros')}
+    res = calcular_agregados(df, {'item': {'chaves': ['GRUPO'], 'medidas': {'n': ('ID', 'size')}}}, derivadas=derivadas)['item']
+    # Nulos recebem funcao('nan') -> 'Outros'
+    esperado = df.assign(GRUPO=np.where(df['TIPO'] == 'Moto', 'Duas rodas', 'Outros'))
+    comparar(res, referencia(esperado, ['GRUPO'], {'n': ('ID', 'size')}))
+
+def test_selecao_vazia(df):
+    itens = {'grupos': {'chaves': ['UF'], 'medidas': MEDIDAS, 'se': {'UF': lambda v: False}},
+             'kpis': {'medidas': MEDIDAS, 'se': {'UF': lambda v: False}}}
+    res = calcular_agregados(df, itens)
+    assert res['grupos'].empty
+    assert list(res['grupos'].columns) == ['UF', *MEDIDAS]
+    assert res['kpis'].iloc[0]['pessoas'] == 0 and res['kpis'].iloc[0]['mortos'] == 0
+
+def test_frame_vazio(df):
+    res = calcular_agregados(df.iloc[:0], {'item': {'chaves': ['UF', 'TIPO'], 'medidas': MEDIDAS}})['item']
+    assert res.empty and list(res.columns) == ['UF', 'TIPO', *MEDIDAS]
+
+def test_mascara_valores_nulos_sao_falsos(df):
+    mascara = mascara_valores(df, {}, 'TIPO', lambda v: True)
+    np.testing.assert_array_equal(mascara, df['TIPO'].notna().to_numpy())
@@ -0,0 +1,137 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import cache_orcado
+from cache_orcado import cache_orcado as cache, somente_cache, ForaDoCache, uso_cache
+
+# Remoção GreedyDual-Size, teto de entradas e carga única por chave
+
+pytestmark = pytest.mark.usefixtures('estado_limpo')
+
+def quadro(mb, valor=0.0):
+    """DataFrame de ~mb MB (float64: 8 bytes por linha)."""
+    return pd.DataFrame({'x': np.full(int(mb * 1e6 / 8), valor)})
+
+def guardados(funcao):
+    return sorted(dict(args)['nome'] for nome_funcao, args in cache_orcado._entradas if nome_funcao == funcao.__qualname__)
+
+def usos(dataset):
+    return dict(cache_orcado._uso[dataset])
+
+def test_sai_primeiro_a_grande_e_barata(monkeypatch):
+    monkeypatch.setattr(cache_orcado.settings, 'CACHE_MAX_MB', 1)
+
+    @cache('teste')
+    def carregar(nome, custo):
+        time.sleep(custo)
+        return quadro(0.4)
+
+    carregar('barata', 0)
+    carregar('cara', 0.2)
+    carregar('nova', 0)  # 1,2 MB > 1 MB: sai a de menor custo por MB, mesmo sendo mais recente que 'cara'
+    assert guardados(carregar) == ['cara', 'nova']
+    assert usos('teste')['remocoes'] == 1
+    assert cache_orcado._estado['bytes'] <= 1e6
+
+def test_entradas_paradas_envelhecem(monkeypatch):
+    monkeypatch.setattr(cache_orcado.settings, 'CACHE_MAX_MB', 1)
+
+    @cache('teste')
+    def carregar(nome):
+        return quadro(0.4)
+
+    carregar('a')
+    carregar('b')
+    carregar('c')   # remove 'a' (empate: a mais antiga) e o relógio sobe
+    carregar('b')   # acerto: 'b' é renovada acima de 'c'
+    carregar('d')
+    assert guardados(carregar) == ['b', 'd']
+
+def test_teto_de_entradas_remove_a_menos_usada():
+    @cache('teste', max_entries=2)
+    def carregar(nome):
+        return quadro(0.01)
+
+    carregar('a')
+    carregar('b')
+    carregar('a')
+    carregar('c')
+    assert guardados(carregar) == ['a', 'c']
+
+def test_cargas_simultaneas_da_mesma_chave():
+    chamadas = []
+    barreira = threading.Barrier(8)
+
+    @cache('teste')
+    def carregar(nome):
+        chamadas.append(nome)
+        time.sleep(0.2)
+        return quadro(0.01, len(chamadas))
+
+    resultados = []
+    def sessao():
+        barreira.wait()
+        resultados.append(carregar('a'))
+    threads = [threading.Thread(target=sessao) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert chamadas == ['a']
+    assert len(resultados) == 8 and all(r.equals(resultados[0]) for r in resultados)
+    # Quem esperou a carga não conta como acerto
+    assert usos('teste') == {'acertos': 0, 'cargas': 1, 'remocoes': 0}
+    carregar('a')
+    assert usos('teste')['acertos'] == 1
+
+def test_devolve_copias_rasas():
+    @cache('teste')
+    def carregar(nome):
+        return {'df': quadro(0.01), 'anos': [2022]}
+
+    primeira, segunda = carregar('a'), carregar('a')
+    # Mesmos arrays do cache (sem cópia profunda por rerun), mas colunas e containers próprios
+    assert np.shares_memory(primeira['df']['x'].to_numpy(), segunda['df']['x'].to_numpy())
+    primeira['df']['x'] = 1.0
+    primeira['df']['nova'] = 1
+    primeira['anos'].append(2023)
+    terceira = carregar('a')
+    assert (terceira['df']['x'] == 0).all() and list(terceira['df'].columns) == ['x']
+    assert terceira['anos'] == [2022]
+
+def test_somente_cache():
+    @cache('teste')
+    def carregar(nome):
+        return quadro(0.01)
+
+    carregar('a')
+    with somente_cache():
+        assert len(carregar('a')) > 0
+        with pytest.raises(ForaDoCache):
+            carregar('b')
+    assert len(carregar('b')) > 0
+
+def test_maior_que_o_orcamento_nao_e_guardado(monkeypatch):
+    monkeypatch.setattr(cache_orcado.settings, 'CACHE_MAX_MB', 1)
+
+    @cache('teste')
+    def carregar(nome):
+        return quadro(2)
+
+    assert len(carregar('a')) == 250000
+    carregar('a')
+    assert guardados(carregar) == [] and usos('teste')['cargas'] == 2
+    assert cache_orcado._estado['bytes'] == 0
+
+def test_argumentos_com_sublinhado_fora_da_chave():
+    chamadas = []
+
+    @cache(lambda args: f"teste-{args['nome']}")
+    def carregar(nome, _conexao=None):
+        chamadas.append(nome)
+        return quadro(0.01)
+
+    carregar('a', _conexao=1)
+    carregar('a', _conexao=2)
+    assert chamadas == ['a']
+    assert set(uso_cache()['dataset']) == {'teste-a'}
@@ -0,0 +1,81 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import cache_orcado
+import coalescencia
+from cache_orcado import cache_orcado as cache
+from coalescencia import carregar_unico, carregar_versionado, versao_servida, aguardar_atualizacoes
+
+# Carga única por (dataset, versão) e versão anterior servida enquanto a nova carrega
+
+pytestmark = pytest.mark.usefixtures('estado_limpo')
+
+@pytest.fixture
+def loader():
+    """Loader com cache_orcado que registra as versões realmente lidas do banco."""
+    lidas, falhar = [], set()
+
+    @cache('teste')
+    def carregar(versao):
+        time.sleep(0.1)
+        if versao in falhar: raise RuntimeError(f"banco fora ({versao})")
+        lidas.append(versao)
+        return pd.DataFrame({'versao': [versao] * 3})
+    carregar.lidas, carregar.falhar = lidas, falhar
+    return carregar
+
+def test_sessoes_simultaneas_uma_carga(loader):
+    barreira = threading.Barrier(8)
+    resultados = []
+    def sessao():
+        barreira.wait()
+        resultados.append(carregar_unico('teste', '1', lambda: loader('1'), reler=True))
+    threads = [threading.Thread(target=sessao) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert loader.lidas == ['1']
+    assert len(resultados) == 8 and all(r['versao'].eq('1').all() for r in resultados)
+    assert coalescencia._em_voo == {}
+
+def test_versao_anterior_durante_a_atualizacao(loader):
+    assert carregar_versionado('teste', '1', lambda: loader('1'), reler=True)[0] == '1'
+    versao, df = carregar_versionado('teste', '2', lambda: loader('2'), reler=True)
+    # A nova versão carrega em segundo plano; a sessão recebe a anterior (relida do cache) na hora
+    assert versao == '1' and df['versao'].eq('1').all()
+    aguardar_atualizacoes()
+    assert versao_servida('teste', '2') == '2'
+    versao, df = carregar_versionado('teste', '2', lambda: loader('2'), reler=True)
+    assert versao == '2' and df['versao'].eq('2').all()
+    assert loader.lidas == ['1', '2']
+
+def test_falha_na_atualizacao_mantem_a_anterior(loader, monkeypatch):
+    monkeypatch.setattr(coalescencia.settings, 'VERSAO_INTERVALO', 3600)
+    carregar_versionado('teste', '1', lambda: loader('1'), reler=True)
+    loader.falhar.add('2')
+    carregar_versionado('teste', '2', lambda: loader('2'), reler=True)
+    aguardar_atualizacoes()
+    assert versao_servida('teste', '2') == '1'
+    # Dentro do intervalo não há nova tentativa: segue servindo a anterior sem disparar outra carga
+    versao, df = carregar_versionado('teste', '2', lambda: loader('2'), reler=True)
+    assert versao == '1' and df['versao'].eq('1').all()
+    assert not coalescencia._atualizacoes['teste'].is_alive()
+    assert loader.lidas == ['1']
+
+def test_anterior_fora_do_cache_carrega_a_nova_na_hora(loader):
+    carregar_versionado('teste', '1', lambda: loader('1'), reler=True)
+    cache_orcado._entradas.clear()
+    cache_orcado._estado['bytes'] = 0
+    versao, df = carregar_versionado('teste', '2', lambda: loader('2'), reler=True)
+    assert versao == '2' and df['versao'].eq('2').all()
+    assert coalescencia._atualizacoes == {}
+
+def test_sem_reler_guarda_o_valor():
+    valores = {'1': np.arange(3), '2': np.arange(5)}
+    assert len(carregar_versionado('teste', '1', lambda: valores['1'])[1]) == 3
+    versao, valor = carregar_versionado('teste', '2', lambda: valores['2'])
+    assert versao == '1' and len(valor) == 3
+    aguardar_atualizacoes()
+    versao, valor = carregar_versionado('teste', '2', lambda: valores['2'])
+    assert versao == '2' and len(valor) == 5
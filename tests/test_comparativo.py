@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from views.comparativo import montar_cubo, TODOS
+
+# Cubo do comparativo: óbitos PRF atribuídos ao município pelo código IBGE ou, sem código, pelo nome
+
+@pytest.fixture
+def produtos():
+    return pd.DataFrame({
+        'UF_LIMPA': ['SP', 'SP', 'SP', 'SP'],
+        'MUNICIPIO_LIMPO': ['Campinas', 'Mogi das Cruzes', 'Registro', 'Registro'],
+        'STATUS_LIMPO': ['REALIZADO'] * 4,
+        'DATA_CADASTRO': pd.to_datetime(['2022-03-01', '2022-05-01', '2022-07-01', '2023-01-10']),
+        'COD_IBGE': [3509502, 0, 0, 0],  # 0 = código não resolvido (default do schema)
+    })
+
+@pytest.fixture
+def prf():
+    return pd.DataFrame({
+        'UF': ['SP'] * 6,
+        'MUNICIPIO': ['CAMPINAS', 'MOGI DAS CRUZES', 'MOGI DAS CRUZES', 'SAO JOSE DOS CAMPOS', 'OSASCO', 'CAMPINAS'],
+        'MORTOS': [3, 1, 1, 5, 4, 2],
+        'ANO': [2022, 2022, 2022, 2022, 2022, 2023],
+        'COD_IBGE': [3509502, 0, 0, 0, 3534401, 3509502],
+    })
+
+def obitos(cubo, uf, municipio):
+    chave = (uf, municipio)
+    if chave not in cubo['cubo'].index: return {}
+    linhas = cubo['cubo'].loc[[chave]]
+    return dict(zip(linhas['ANO'], linhas['OBITOS_PRF']))
+
+def test_codigo_zero_segue_pelo_nome(produtos, prf):
+    cubo = montar_cubo(produtos, prf)
+    assert obitos(cubo, 'SP', 'Campinas') == {2022: 3, 2023: 2}
+    # Sem código: só os óbitos do próprio nome, não o total não resolvido da UF
+    assert obitos(cubo, 'SP', 'Mogi das Cruzes') == {2022: 2}
+    assert sum(obitos(cubo, 'SP', 'Registro').values()) == 0
+    assert obitos(cubo, 'SP', TODOS)[2022] == 14
+
+def test_metas_por_municipio_e_niveis(produtos, prf):
+    cubo = montar_cubo(produtos, prf)['cubo']
+    metas = cubo.groupby(level=[0, 1])['METAS'].sum()
+    assert metas[('SP', 'Registro')] == 2 and metas[('SP', 'Campinas')] == 1
+    assert metas[('SP', TODOS)] == metas[(TODOS, TODOS)] == 4
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indices import indexar_coluna, linhas_selecionadas
+
+# linhas_selecionadas (listas ordenadas de linhas por valor) contra a máscara isin do pandas
+
+@pytest.fixture
+def base():
+    rng = np.random.default_rng(11)
+    n = 5000
+    return pd.DataFrame({
+        'ANO': rng.choice([2021, 2022, 2023], n),
+        'UF': pd.Categorical(rng.choice(['SP', 'RJ', 'MG', None], n), categories=['AC', 'MG', 'RJ', 'SP']),
+        'BR': rng.choice(['101', '116', '040', None], n).astype(object),
+    })
+
+@pytest.fixture
+def indice(base):
+    return {d: indexar_coluna(base[d]) for d in base.columns}
+
+def esperado(base, selecao):
+    mascara = np.ones(len(base), dtype=bool)
+    for dim, valores in selecao.items():
+        if valores: mascara &= base[dim].astype(str).isin([str(v) for v in valores]).to_numpy()
+    return np.flatnonzero(mascara)
+
+@pytest.mark.parametrize('selecao', [
+    {'ANO': [2022]},
+    {'ANO': [2021, 2023], 'UF': ['SP']},
+    {'UF': ['RJ', 'MG'], 'BR': ['101', '040']},
+    {'ANO': [2023], 'UF': ['SP', 'RJ', 'MG'], 'BR': ['116']},
+    {'ANO': [], 'UF': ['MG']},
+])
+def test_linhas_iguais_a_mascara(base, indice, selecao):
+    linhas = linhas_selecionadas(indice, selecao)
+    np.testing.assert_array_equal(linhas, esperado(base, selecao))
+    assert np.all(np.diff(linhas) > 0)  # posições crescentes: o take preserva a ordem da base
+
+def test_sem_filtros_retorna_none(indice):
+    assert linhas_selecionadas(indice, {'ANO': [], 'UF': []}) is None
+
+def test_nulos_nunca_selecionados(base, indice):
+    linhas = linhas_selecionadas(indice, {'UF': ['SP', 'RJ', 'MG', 'AC']})
+    assert base['UF'].iloc[linhas].notna().all()
+    assert len(linhas) == base['UF'].notna().sum()
+
+def test_valores_ausentes_ou_sem_linhas_dao_selecao_vazia(indice):
+    # 'AC' é categoria sem linhas; 1999 e 'XX' não existem na base
+    for selecao in ({'UF': ['AC']}, {'ANO': [1999]}, {'ANO': [2022], 'BR': ['XX']}):
+        linhas = linhas_selecionadas(indice, selecao)
+        assert linhas is not None and len(linhas) == 0
+
+def test_base_vazia():
+    indice = {'ANO': indexar_coluna(pd.Series([], dtype='int64'))}
+    assert len(linhas_selecionadas(indice, {'ANO': [2022]})) == 0